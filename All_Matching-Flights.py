@@ -1,43 +1,52 @@
-import pandas as pd
-import math
+from ingest import CONNECTION_KEYS, aggregate_segments, load_connections
+from preprocess import avg_pax_per_flight, load_factor
 
 
 # # Load list of 473 valid connections
-valid_connections = pd.read_excel("Data/Connections.xlsx")
-
-# Load raw data files from 2022, 2023, 202
-df2022 = pd.read_csv("Data/T_T100I_SEGMENT_ALL_CARRIER_2022.csv")
-df2023 = pd.read_csv("Data/T_T100I_SEGMENT_ALL_CARRIER_2023.csv")
-df2024 = pd.read_csv("Data/T_T100I_SEGMENT_ALL_CARRIER_2024.csv")
-
-# Combine all yearly datasets into one DataFrame
-df_all = pd.concat([df2022, df2023, df2024], ignore_index=True)
-
-# Define the columns that identify a connection (without year/month)
-connection_keys = ["AIRLINE_ID", "UNIQUE_CARRIER_ENTITY", "ORIGIN", "DEST", "AIRCRAFT_TYPE"]
-
-# Merge: keep only rows in df_all that match a valid connection (inner join)
-filtered_df = df_all.merge(valid_connections[connection_keys], how="inner", on=connection_keys)
-
-# Group by connection + year + month and sum numeric values
-grouped = filtered_df.groupby(connection_keys + ["YEAR", "MONTH"]).agg("sum").reset_index()
+valid_connections = load_connections("Data/Connections.xlsx")
+
+# Raw data files from 2022, 2023, 2024
+files = [
+    "Data/T_T100I_SEGMENT_ALL_CARRIER_2022.csv",
+    "Data/T_T100I_SEGMENT_ALL_CARRIER_2023.csv",
+    "Data/T_T100I_SEGMENT_ALL_CARRIER_2024.csv"
+]
+
+# Numeric values that are summed up per connection and month
+sum_columns = [
+    "DEPARTURES_SCHEDULED", "DEPARTURES_PERFORMED", "PAYLOAD", "SEATS", "PASSENGERS",
+    "FREIGHT", "MAIL", "DISTANCE", "RAMP_TO_RAMP", "AIR_TIME"
+]
+
+# Descriptive columns, these are the same for all rows of a connection
+first_columns = [
+    "UNIQUE_CARRIER", "UNIQUE_CARRIER_NAME", "REGION", "CARRIER", "CARRIER_NAME", "CARRIER_GROUP",
+    "CARRIER_GROUP_NEW", "ORIGIN_AIRPORT_ID", "ORIGIN_AIRPORT_SEQ_ID", "ORIGIN_CITY_MARKET_ID",
+    "ORIGIN_CITY_NAME", "ORIGIN_COUNTRY", "ORIGIN_COUNTRY_NAME", "ORIGIN_WAC", "DEST_AIRPORT_ID",
+    "DEST_AIRPORT_SEQ_ID", "DEST_CITY_MARKET_ID", "DEST_CITY_NAME", "DEST_COUNTRY", "DEST_COUNTRY_NAME",
+    "DEST_WAC", "AIRCRAFT_GROUP", "AIRCRAFT_CONFIG", "QUARTER", "DISTANCE_GROUP", "CLASS"
+]
+
+# Stream all yearly files, keep only rows that match a valid connection and
+# group by connection + year + month while reading
+group_keys = CONNECTION_KEYS + ["YEAR", "MONTH"]
+grouped = aggregate_segments(
+    files,
+    group_keys + sum_columns + first_columns,
+    group_keys,
+    {**{col: "sum" for col in sum_columns}, **{col: "first" for col in first_columns}},
+    connections=valid_connections
+).reset_index()
+grouped[sum_columns] = grouped[sum_columns].astype("float64")
 
 # Compute average passengers per flight (rounded up)
-grouped["AVG_PAX_PER_FLIGHT"] = grouped.apply(
-    lambda row: math.ceil(row["PASSENGERS"] / row["DEPARTURES_PERFORMED"]) if row["DEPARTURES_PERFORMED"] > 0 else 0,
-    axis=1
-)
+grouped["AVG_PAX_PER_FLIGHT"] = avg_pax_per_flight(grouped["PASSENGERS"], grouped["DEPARTURES_PERFORMED"])
 
 # Compute load factor (passengers / seats)
-grouped["LOAD_FACTOR"] = grouped.apply(
-    lambda row: row["PASSENGERS"] / row["SEATS"] if row["SEATS"] > 0 else 0,
-    axis=1
-)
+grouped["LOAD_FACTOR"] = load_factor(grouped["PASSENGERS"], grouped["SEATS"])
 
 # Overwrite the original Connections.xlsx with grouped data
 grouped.to_excel("Data/Grouped_Valid_Connections.xlsx", index=False)
 
 # Print how many rows were kept
-print(f" Raw data rows before grouping: {len(filtered_df)}")
 print(f" Grouped rows saved: {len(grouped)} (expected: 17.028)")
-
@@ -1,60 +1,58 @@
 #! /usr/bin/python3
 import os, sys
-import pandas as pd
+import numpy as np
 import math
-
-def check_connection(con, df, k):
-
-    air, uce, org, dst, atp = con
-    allmonths = [1, 2, 3, 4,5, 6,7, 8,9, 10,11,12]
-
-    subdf = df[(df["AIRLINE_ID"] == air)]
-    subdf = subdf[(subdf["UNIQUE_CARRIER_ENTITY"] == uce)]
-    subdf = subdf[(subdf["ORIGIN"] == org)]
-    subdf = subdf[(subdf["DEST"] == dst)]
-    subdf = subdf[(subdf["AIRCRAFT_TYPE"] == atp)]
-
-    months = [int(a) for a in subdf["MONTH"]]
-
-    if len(months) < 12:
-        return False
-
-    ok = True
-
-    for mon in allmonths:
-        if (mon not in months):
-            ok = False
-            break
-
-    if (ok == False):
-        return ok
-
-    for mon in allmonths:
-        numpax = 0.0
-        dfsel = subdf[(subdf["MONTH"] == mon)]
-        pax = dfsel["PASSENGERS"]
-        dep = dfsel["DEPARTURES_PERFORMED"]
-        numpax = 0
-        numdep = 0
-
-        for r in range(0, pax.size):
-            if (int(dep.iat[r]) > 0):
-                numpax += int(pax.iat[r])
-                numdep += int(dep.iat[r])
-
-        if (numdep > 0):
-            pax_per_dep = math.ceil(numpax / numdep)
-        else:
-            pax_per_dep = 0
-
-        if pax_per_dep < k:
-            ok = False
-            break
-
-    if (ok == True):
-        print(con, "passed")
-
-    return ok
+from ingest import CONNECTION_KEYS, aggregate_segments
+
+ALL_MONTHS = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12]
+
+# Minimum passengers per departure (rounded up) a connection needs in every month
+MIN_PAX_PER_DEPARTURE = 100
+
+# Yearly raw data files checked by default
+CSV_FILES = [
+    "Data/T_T100I_SEGMENT_ALL_CARRIER_2022.csv",
+    "Data/T_T100I_SEGMENT_ALL_CARRIER_2023.csv",
+    "Data/T_T100I_SEGMENT_ALL_CARRIER_2024.csv"
+]
+
+# Raw columns needed for the eligibility check
+COLUMNS = ["PASSENGERS", "DEPARTURES_PERFORMED", "SEATS", "AIRLINE_ID", "UNIQUE_CARRIER_ENTITY", "ORIGIN", "DEST", "AIRCRAFT_TYPE", "MONTH"]
+
+# Passengers and departures of a chunk that count for the check.
+# Only rows with departures performed contribute, like the old per-connection loop did.
+# The YEAR column is kept if the chunk has one.
+def connection_month_flows(chunk):
+    dep = chunk["DEPARTURES_PERFORMED"].fillna(0).astype("int64")
+    pax = chunk["PASSENGERS"].fillna(0).astype("int64")
+    flown = dep > 0
+
+    keys = CONNECTION_KEYS + [col for col in ["YEAR", "MONTH"] if col in chunk.columns]
+    flows = chunk[keys].assign(
+        NUM_PAX=pax.where(flown, 0),
+        NUM_DEP=dep.where(flown, 0)
+    )
+    return flows[flows["MONTH"].isin(ALL_MONTHS)]
+
+# Sum passengers and departures per connection and month in one pass over a yearly data frame
+def monthly_connection_stats(df):
+    flows = connection_month_flows(df)
+    return flows.groupby(CONNECTION_KEYS + ["MONTH"], sort=False)[["NUM_PAX", "NUM_DEP"]].sum()
+
+# Same as monthly_connection_stats, but streams the yearly csv file in chunks.
+# If connections is given, all other connections are skipped while reading.
+def read_monthly_connection_stats(csv, connections=None):
+    return aggregate_segments(csv, COLUMNS, CONNECTION_KEYS + ["MONTH"], {"NUM_PAX": "sum", "NUM_DEP": "sum"},
+                              connections=connections, prepare=connection_month_flows)
+
+# Return the connections (as MultiIndex) that operate in all 12 months with at least k passengers
+# per departure (rounded up) in every month
+def passing_connections(stats, k):
+    pax_per_dep = np.ceil(stats["NUM_PAX"] / stats["NUM_DEP"].where(stats["NUM_DEP"] > 0)).fillna(0)
+
+    per_con = (pax_per_dep >= k).groupby(level=CONNECTION_KEYS, sort=False).agg(["size", "all"])
+    passed = per_con[(per_con["size"] == len(ALL_MONTHS)) & per_con["all"]]
+    return passed.index
 
 def print_connection(con, df):
     air, uce, org, dst, atp = con
@@ -89,42 +87,23 @@ def print_connection(con, df):
         print(f"Month {mon}: Total number of passengers: {numpax}, Total number of departures: {numdep}, pax_per_dep = ", pax_per_dep)
 
 
-def read(csv1, csv2, csv3):
-    df1 = pd.read_csv(csv1, sep=",", usecols=["PASSENGERS", "DEPARTURES_PERFORMED", "SEATS", "AIRLINE_ID","UNIQUE_CARRIER_ENTITY","ORIGIN","DEST","AIRCRAFT_TYPE","MONTH"])
-    df2 = pd.read_csv(csv2, sep=",", usecols=["PASSENGERS", "DEPARTURES_PERFORMED", "SEATS", "AIRLINE_ID","UNIQUE_CARRIER_ENTITY","ORIGIN","DEST","AIRCRAFT_TYPE","MONTH"])
-    df3 = pd.read_csv(csv3, sep=",", usecols=["PASSENGERS", "DEPARTURES_PERFORMED", "SEATS", "AIRLINE_ID","UNIQUE_CARRIER_ENTITY","ORIGIN","DEST","AIRCRAFT_TYPE","MONTH"])
-
-    k = 100
-
-    connections = set()
-    passed = []
-
-    for index, row in df1.iterrows():
-        air = row["AIRLINE_ID"]
-        uce = row["UNIQUE_CARRIER_ENTITY"]
-        org = row["ORIGIN"]
-        dst = row["DEST"]
-        atp = row["AIRCRAFT_TYPE"]
-
-        con = air, uce, org, dst, atp
-
-        connections.add(con)
+def read(csv1, *later_csvs):
+    k = MIN_PAX_PER_DEPARTURE
 
+    stats = read_monthly_connection_stats(csv1)
+    connections = stats.index.droplevel("MONTH").unique()
     print("Found",len(connections), " connections in first data frame.")
 
-    for con in connections:
-
-        result = check_connection(con, df1, k)
-
-        if (result == True):
-            result = check_connection(con, df2, k)
-
-        if (result == True):
-            result = check_connection(con, df3, k)
-
-        if (result == True):
-            passed.append(con)
+    # A connection has to pass the check in every year. Later years only
+    # need to be read for the connections that are still passing.
+    passed = passing_connections(stats, k)
+    print(len(passed), "connections still passing.")
+    for csv in later_csvs:
+        stats = read_monthly_connection_stats(csv, connections=passed)
+        passed = passed.intersection(passing_connections(stats, k))
+        print(len(passed), "connections still passing.")
 
+    passed = passed.sort_values()
 
 #    for con in passed:
 #        print_connection(con,df1)
@@ -134,14 +113,12 @@ def read(csv1, csv2, csv3):
     print(len(passed), "connections passed for all data frames.")
 
     # Save Excel file with the valid connections
-    df_output = pd.DataFrame(passed, columns=["AIRLINE_ID", "UNIQUE_CARRIER_ENTITY", "ORIGIN", "DEST", "AIRCRAFT_TYPE"])
+    df_output = passed.to_frame(index=False)
     df_output.to_excel("Data/Connections.xlsx", index=False)
     #print("Excel File 'Connections.xlsx' was created successfully.")
 
 
 if __name__ == "__main__":
-    csv1 = "Data/T_T100I_SEGMENT_ALL_CARRIER_2022.csv"
-    csv2 = "Data/T_T100I_SEGMENT_ALL_CARRIER_2023.csv"
-    csv3 = "Data/T_T100I_SEGMENT_ALL_CARRIER_2024.csv"
-    read(csv1, csv2, csv3)
+    # Yearly files to check, in chronological order (default: CSV_FILES)
+    read(*(sys.argv[1:] or CSV_FILES))
 
@@ -2,13 +2,19 @@
 import dash
 from dash import dcc, html, Input, Output
 import plotly.express as px
-import pandas as pd
+from datastore import load_grouped
+from top_routes import build_top_routes_cube, top_routes
 
-# Load the grouped flight data from the new Excel file
-df = pd.read_excel("Data/Grouped_Valid_Connections.xlsx")
+# Load the grouped flight data (only the columns needed for the charts)
+df = load_grouped(["YEAR", "MONTH", "ORIGIN", "DEST", "PASSENGERS", "SEATS"])
+
+# Passengers, seats and load factor per year, month and route, aggregated once
+cube = build_top_routes_cube(df)
 
 # Initialize the Dash app
 app = dash.Dash(__name__)
+# WSGI application for production servers (see serve.py)
+server = app.server
 
 # Layout of the dashboard
 app.layout = html.Div([
@@ -49,22 +55,9 @@ style={'backgroundColor': 'black', 'padding': '20px'})
      Input('month-dropdown', 'value')]
 )
 def update_graphs(selected_year, selected_month):
-    # Filter
-    filtered_df = df[(df['YEAR'] == selected_year) & (df['MONTH'] == selected_month)].copy()
-    filtered_df = filtered_df[filtered_df['SEATS'] > 0]  # Schutz vor Division durch 0
-    filtered_df['LOAD_FACTOR'] = filtered_df['PASSENGERS'] / filtered_df['SEATS']
-
-    # Gruppierung
-    grouped = filtered_df.groupby(['ORIGIN', 'DEST'], as_index=False).agg({
-        'PASSENGERS': 'sum',
-        'SEATS': 'sum'
-    })
-    grouped['ROUTE'] = grouped['ORIGIN'] + " → " + grouped['DEST']
-    grouped['LOAD_FACTOR'] = grouped['PASSENGERS'] / grouped['SEATS']
-
     # Diagramm 1: Passagierzahlen
     fig_passengers = px.bar(
-        grouped.sort_values('PASSENGERS', ascending=False).head(20),
+        top_routes(cube, selected_year, selected_month, n=20, by='PASSENGERS'),
         x='ROUTE',
         y='PASSENGERS',
         title=f"Top 20 Routes by Number of Passengers ({selected_year}-{selected_month})"
@@ -73,7 +66,7 @@ def update_graphs(selected_year, selected_month):
 
     # Diagramm 2: Auslastung
     fig_loadfactor = px.bar(
-        grouped.sort_values('LOAD_FACTOR', ascending=False).head(20),
+        top_routes(cube, selected_year, selected_month, n=20, by='LOAD_FACTOR'),
         x='ROUTE',
         y='LOAD_FACTOR',
         title=f"Top 20 Routes by Load Factor ({selected_year}-{selected_month})",
@@ -5,17 +5,20 @@ from statsmodels.tsa.statespace.sarimax import SARIMAX
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 import numpy as np
 import warnings
+from datastore import load_grouped
 
 warnings.filterwarnings("ignore")
 
 # Load dataset
-df = pd.read_csv("Data/Grouped_All_Valid_Connections.csv")
+df = load_grouped(["YEAR", "MONTH", "ORIGIN", "DEST", "PASSENGERS"])
 df['DATE'] = pd.to_datetime(df[['YEAR', 'MONTH']].assign(DAY=1))  # Create a datetime column from YEAR and MONTH
 df['ROUTE'] = df['ORIGIN'] + " → " + df['DEST']  # Create readable route names
 routes = df['ROUTE'].unique()
 
 # Initialize Dash app and layout
 app = Dash(__name__)
+# WSGI application for production servers (see serve.py)
+server = app.server
 app.layout = html.Div(style={'backgroundColor': '#111111', 'color': 'white', 'padding': '20px'}, children=[
     html.H1("📈 SARIMA Forecast: Validation 2024 & Prediction 2025", style={'textAlign': 'center'}),
     html.Label("Select a route:", style={'fontSize': '18px'}),
@@ -1,18 +1,23 @@
+import os
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import plotly.express as px
 import numpy as np
-from statsmodels.tsa.seasonal import seasonal_decompose
 import plotly.graph_objects as go
-from scipy import stats
-from statsmodels.tsa.seasonal import STL
-from sklearn.metrics import mean_absolute_error
-from statsmodels.tsa.holtwinters import ExponentialSmoothing
-from statsmodels.tsa.statespace.sarimax import SARIMAX
-from sklearn.metrics import mean_absolute_error
+import profiling
+from profiling import stage
+from datastore import load_grouped, route_month_series
 
- 
+# statsmodels and sklearn are imported inside the functions that fit models,
+# so that importing this module (e.g. by the dashboard) stays fast
 
-airports_df = pd.read_csv("airports.dat")  
+INSIGHTS_FILE = "Data/precomputed_route_insights.csv"
+
+# Version of the insight computation, part of every route's input hash. Increase it whenever
+# route_insight or the models change, so that an incremental refresh refits all routes.
+INSIGHTS_VERSION = 3
 
 
 def compute_top_routes(df, top_n=10):
@@ -38,6 +43,8 @@ def compute_top_routes(df, top_n=10):
 
 #EDA:
 def get_trend_plot(df):
+    from statsmodels.tsa.seasonal import seasonal_decompose
+
     fig = go.Figure()
 
     df = df.copy()
@@ -131,23 +138,26 @@ def get_outliers_plot(df):
     fig.update_layout(title="Outliers in Passengers", xaxis_title="Date", yaxis_title="Passengers")
     return fig
    
-def generate_route_insights(df):
-    
-
-    insights = []
-
-    df["DATE"] = pd.to_datetime(df["DATE"])
-    df["ROUTE"] = df["ORIGIN"] + " → " + df["DEST"]
-
-    all_routes = df["ROUTE"].unique()
-
-    for route in all_routes:
-        route_df = df[df["ROUTE"] == route].sort_values("DATE")
-
-        # Skip routes with missing values or too little data
-        if route_df["PASSENGERS"].isnull().any() or len(route_df) < 36:
-            continue
-
+# Compute trend, seasonality, outlier and forecast error metrics for a single route.
+# route_df: monthly passengers of the route (DATE, PASSENGERS, see datastore.route_month_series).
+# Returns None for routes with missing values or too little data.
+# mae_hw: Holt-Winters MAE computed beforehand (see batch_holt_winters_mae), None to fit it with statsmodels here
+# metrics: (slope, season_amp_pct, outliers) computed beforehand (see panel_route_metrics), None to compute them here
+def route_insight(route, route_df, mae_hw=None, metrics=None):
+    from statsmodels.tsa.seasonal import STL
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+    from sklearn.metrics import mean_absolute_error
+
+    route_df = route_df.sort_values("DATE")
+
+    # Skip routes with missing values or too little data
+    if route_df["PASSENGERS"].isnull().any() or len(route_df) < 36:
+        return None
+
+    if metrics is not None:
+        slope, season_amp_pct, outliers = metrics
+    else:
         y = route_df["PASSENGERS"].values
         x = np.arange(len(y))
 
@@ -157,7 +167,8 @@ def generate_route_insights(df):
         # STL decomposition for seasonality and outliers
         ts = route_df.set_index("DATE")["PASSENGERS"]
         stl = STL(ts, period=12)
-        res = stl.fit()
+        with stage("stl_fit", route=route):
+            res = stl.fit()
 
         avg_passengers = ts.mean()
         season_amp = res.seasonal.max() - res.seasonal.min()
@@ -169,8 +180,9 @@ def generate_route_insights(df):
         q1, q3 = np.percentile(resid, [25, 75])
         iqr = q3 - q1
         outliers = ((resid < (q1 - 1.5 * iqr)) | (resid > (q3 + 1.5 * iqr))).sum()
-        
-        # Forecast Error: Holt-Winters (2024) 
+    
+    # Forecast Error: Holt-Winters (2024) 
+    if mae_hw is None:
         try:
             train_hw = route_df[route_df["DATE"].dt.year < 2024]
             valid_hw = route_df[route_df["DATE"].dt.year == 2024]
@@ -178,53 +190,225 @@ def generate_route_insights(df):
             ts_hw.index.freq = 'MS'
 
             model_hw = ExponentialSmoothing(ts_hw, trend='add', seasonal='add', seasonal_periods=12)
-            fit_hw = model_hw.fit()
+            with stage("holt_winters_fit", route=route):
+                fit_hw = model_hw.fit()
             forecast_hw = fit_hw.forecast(12)
 
             mae_hw = mean_absolute_error(valid_hw["PASSENGERS"], forecast_hw)
         except:
             mae_hw = np.nan
 
-        # Forecast Error: SARIMA (2024)
-        try:
-            train_sarima = route_df[route_df["DATE"] < "2024-01-01"]
-            valid_sarima = route_df[(route_df["DATE"] >= "2024-01-01") & (route_df["DATE"] < "2025-01-01")]
-            ts_sarima = train_sarima.set_index("DATE")["PASSENGERS"]
-            ts_sarima.index.freq = 'MS'
+    # Forecast Error: SARIMA (2024)
+    try:
+        train_sarima = route_df[route_df["DATE"] < "2024-01-01"]
+        valid_sarima = route_df[(route_df["DATE"] >= "2024-01-01") & (route_df["DATE"] < "2025-01-01")]
+        ts_sarima = train_sarima.set_index("DATE")["PASSENGERS"]
+        ts_sarima.index.freq = 'MS'
 
-            model_sarima = SARIMAX(ts_sarima, order=(1, 1, 1), seasonal_order=(1, 1, 1, 12))
+        model_sarima = SARIMAX(ts_sarima, order=(1, 1, 1), seasonal_order=(1, 1, 1, 12))
+        with stage("sarimax_fit", route=route):
             fit_sarima = model_sarima.fit(disp=False)
-            forecast_sarima = fit_sarima.get_forecast(steps=12).predicted_mean
+        forecast_sarima = fit_sarima.get_forecast(steps=12).predicted_mean
+
+        mae_sarima = mean_absolute_error(valid_sarima["PASSENGERS"], forecast_sarima)
+    except:
+        mae_sarima = np.nan
+
+    # Collect results
+    return {
+        "route": route,
+        "trend_slope": round(slope, 2),
+        "season_amp_pct": round(season_amp_pct, 1),
+        "outlier_count": int(outliers),
+        "mae_holt": round(mae_hw, 1) if not np.isnan(mae_hw) else np.nan,
+        "mae_sarima": round(mae_sarima, 1) if not np.isnan(mae_sarima) else np.nan,
+        "quotient_holt": round(mae_hw / slope, 3) if (not np.isnan(mae_hw) and slope != 0) else np.nan,
+        "quotient_sarima": round(mae_sarima / slope, 3) if (not np.isnan(mae_sarima) and slope != 0) else np.nan
+    }
+
+# Trend, seasonality and outlier metrics of all routes as (routes x months) arrays: least squares slopes in
+# closed form, seasonal amplitude and IQR outlier counts over the stacked STL components. Only STL itself is
+# fitted per route. Routes with the same number of months are processed together, routes that route_insight
+# skips are left out. route_groups: (route, monthly passengers) pairs as for route_insight.
+# Returns a dict route -> (slope, season_amp_pct, outliers) as route_insight computes them.
+def panel_route_metrics(route_groups):
+    from statsmodels.tsa.seasonal import STL
+
+    panels = {}
+    for route, route_df in route_groups:
+        if route_df["PASSENGERS"].isnull().any() or len(route_df) < 36:
+            continue
+        y = route_df.sort_values("DATE")["PASSENGERS"].to_numpy(dtype="float64")
+        panels.setdefault(len(y), []).append((route, y))
 
-            mae_sarima = mean_absolute_error(valid_sarima["PASSENGERS"], forecast_sarima)
-        except:
-            mae_sarima = np.nan
-
-        # Collect results
-        insights.append({
-            "route": route,
-            "trend_slope": round(slope, 2),
-            "season_amp_pct": round(season_amp_pct, 1),
-            "outlier_count": int(outliers),
-            "mae_holt": round(mae_hw, 1) if not np.isnan(mae_hw) else np.nan,
-            "mae_sarima": round(mae_sarima, 1) if not np.isnan(mae_sarima) else np.nan,
-            "quotient_holt": round(mae_hw / slope, 3) if (not np.isnan(mae_hw) and slope != 0) else np.nan,
-            "quotient_sarima": round(mae_sarima / slope, 3) if (not np.isnan(mae_sarima) and slope != 0) else np.nan
-        })
-
-    df_result = pd.DataFrame(insights)
+    metrics = {}
+    for panel in panels.values():
+        routes = [route for route, _ in panel]
+        y = np.stack([series for _, series in panel])
+
+        # Slope of the least squares line through (month index, passengers) of every route
+        x = np.arange(y.shape[1]) - (y.shape[1] - 1) / 2
+        slopes = ((y - y.mean(axis=1, keepdims=True)) * x).sum(axis=1) / (x ** 2).sum()
+
+        decompositions = [STL(series, period=12).fit() for series in y]
+        seasonal = np.stack([res.seasonal for res in decompositions])
+        resid = np.stack([res.resid for res in decompositions])
+
+        season_amp_pct = (seasonal.max(axis=1) - seasonal.min(axis=1)) / y.mean(axis=1) * 100
+
+        # IQR method to detect outliers in residuals
+        q1, q3 = np.percentile(resid, [25, 75], axis=1)
+        iqr = q3 - q1
+        outliers = ((resid < (q1 - 1.5 * iqr)[:, None]) | (resid > (q3 + 1.5 * iqr)[:, None])).sum(axis=1)
+
+        metrics.update(zip(routes, zip(slopes, season_amp_pct, outliers)))
+
+    return metrics
+
+
+# Holt-Winters MAE (2024) of all routes with the NumPy batch engine (holtwinters.py) instead of one
+# statsmodels fit per route. Fitted on the months before 2024, routes with the same number of training
+# months are fitted together. Like the statsmodels default the initial states are estimated, so the fit is
+# the one of route_insight, or one with a lower training error where statsmodels stops in a local optimum.
+# route_groups: (route, monthly passengers) pairs as for route_insight. Returns a dict route -> MAE.
+def batch_holt_winters_mae(route_groups):
+    from holtwinters import fit_holt_winters, forecast
+
+    maes = {}
+    panels = {}
+    for route, route_df in route_groups:
+        route_df = route_df.sort_values("DATE")
+        train = route_df.loc[route_df["DATE"].dt.year < 2024, "PASSENGERS"].to_numpy(dtype="float64")
+        valid = route_df.loc[route_df["DATE"].dt.year == 2024, "PASSENGERS"].to_numpy(dtype="float64")
+
+        # Rows that are not one per month (see route_month_series) fail the statsmodels fit as well
+        if len(valid) != 12 or len(train) < 24 or np.isnan(train).any() or route_df["DATE"].duplicated().any():
+            maes[route] = np.nan
+        else:
+            panels.setdefault(len(train), []).append((route, train, valid))
+
+    for panel in panels.values():
+        routes = [route for route, _, _ in panel]
+        fit = fit_holt_winters(np.stack([train for _, train, _ in panel]))
+        errors = np.abs(forecast(fit, 12) - np.stack([valid for _, _, valid in panel])).mean(axis=1)
+        maes.update(zip(routes, errors))
+
+    return maes
+
+
+# Hash of everything a route's insight row depends on: its monthly series (in input order), the model
+# configuration and the version of the insight code
+def route_input_hash(route_df, config):
+    digest = hashlib.sha1(repr((INSIGHTS_VERSION, sorted(config.items()))).encode())
+    digest.update(route_df["DATE"].to_numpy(dtype="datetime64[ns]").tobytes())
+    digest.update(route_df["PASSENGERS"].to_numpy(dtype="float64").tobytes())
+    return digest.hexdigest()[:16]
+
+
+# Stored insight rows by input hash, empty if there are none yet (or they were written without hashes)
+def load_stored_insights(path=INSIGHTS_FILE):
+    if not os.path.exists(path):
+        return {}
+    stored = pd.read_csv(path)
+    if "input_hash" not in stored.columns:
+        return {}
+    return {row["input_hash"]: row for row in stored.to_dict("records")}
+
+
+# Compute insights for all routes and save them to Data/precomputed_route_insights.csv, together with
+# the input hash of every route (route_input_hash). Every route is reduced to its monthly passengers
+# (route_month_series) before anything is computed on it.
+# With n_jobs > 1 (or -1 for all cores) the routes are processed by a pool of worker processes;
+# the result is the same as for a serial run.
+# holt_winters: "statsmodels" fits every route separately, "batch" fits all routes at once (batch_holt_winters_mae)
+# panel: compute the trend, seasonality and outlier metrics for all routes at once (panel_route_metrics)
+# incremental: reuse the stored rows of routes whose input hash is unchanged and only refit the other routes
+def generate_route_insights(df, n_jobs=1, holt_winters="statsmodels", panel=False, incremental=False):
+    df["DATE"] = pd.to_datetime(df["DATE"])
+    df["ROUTE"] = df["ORIGIN"] + " → " + df["DEST"]
+
+    # One series per route and month (the connections of a route summed up) for all metrics and models,
+    # split by route once instead of filtering the whole frame for every route
+    with stage("route_split", rows=len(df)):
+        route_groups = list(route_month_series(df).groupby("ROUTE", sort=False))
+    all_routes = [route for route, _ in route_groups]
+
+    # The metrics of a route only depend on its own series, so unchanged routes can be taken over
+    config = {"holt_winters": holt_winters}
+    with stage("input_hash", routes=len(route_groups)):
+        hashes = {route: route_input_hash(route_df, config) for route, route_df in route_groups}
+    reused = []
+    if incremental:
+        stored = load_stored_insights()
+        reused = [stored[hashes[route]] for route, _ in route_groups
+                  if hashes[route] in stored and stored[hashes[route]]["route"] == route]
+        unchanged = {row["route"] for row in reused}
+        route_groups = [(route, route_df) for route, route_df in route_groups if route not in unchanged]
+        print(f"Reusing {len(reused)} route insights, refitting {len(route_groups)} routes.")
+
+    routes = [route for route, _ in route_groups]
+    route_dfs = [route_df for _, route_df in route_groups]
+
+    if holt_winters == "batch":
+        with stage("batch_holt_winters", routes=len(route_groups)):
+            maes = batch_holt_winters_mae(route_groups)
+        mae_hws = [maes[route] for route in routes]
+    else:
+        mae_hws = [None] * len(routes)
+
+    if panel:
+        with stage("panel_metrics", routes=len(route_groups)):
+            metrics = panel_route_metrics(route_groups)
+        route_metrics = [metrics.get(route) for route in routes]
+    else:
+        route_metrics = [None] * len(routes)
+
+    if n_jobs is not None and n_jobs < 0:
+        n_jobs = os.cpu_count()
+
+    with stage("route_fits", routes=len(routes), jobs=n_jobs):
+        if not n_jobs or n_jobs == 1:
+            results = list(map(route_insight, routes, route_dfs, mae_hws, route_metrics))
+        else:
+            chunksize = max(1, len(route_groups) // (n_jobs * 4))
+            # executor.map returns the results in input order
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                results = list(executor.map(route_insight, routes, route_dfs, mae_hws, route_metrics, chunksize=chunksize))
+
+    insights = {row["route"]: row for row in reused}
+    insights.update((result["route"], {**result, "input_hash": hashes[result["route"]]})
+                    for result in results if result is not None)
+
+    # Rows in route order, like a full run
+    df_result = pd.DataFrame([insights[route] for route in all_routes if route in insights])
     df_result = df_result.sort_values("trend_slope", ascending=False).reset_index(drop=True)
     
     # Save the insights to CSV for dashboard use
-    df_result.to_csv("Data/precomputed_route_insights.csv", index=False)
+    with stage("write_insights", rows=len(df_result)):
+        df_result.to_csv(INSIGHTS_FILE, index=False)
     
     return df_result
 
 if __name__ == "__main__":
-    
-    df = pd.read_csv("Data/Grouped_All_Valid_Connections.csv",low_memory=False)#, dtype={14: str})
-    df["DATE"] = pd.to_datetime(df["YEAR"].astype(str) + "-" + df["MONTH"].astype(str) + "-01")
-    df["ROUTE"] = df["ORIGIN"] + " → " + df["DEST"]
-    
-    generate_route_insights(df)
+    parser = argparse.ArgumentParser(description="Precompute route insights for the dashboard.")
+    parser.add_argument("--jobs", type=int, default=1, help="number of worker processes (-1 = all cores)")
+    parser.add_argument("--holt-winters", choices=["statsmodels", "batch"], default="statsmodels",
+                        help="fit the Holt-Winters models per route with statsmodels or all at once with NumPy")
+    parser.add_argument("--panel", action="store_true",
+                        help="compute trend, seasonality and outlier metrics for all routes at once")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only refit routes whose data, model configuration or code version changed")
+    parser.add_argument("--trace", help=f"write a timing trace of the stages to this file (or set {profiling.TRACE_ENV})")
+    parser.add_argument("--profile", help="run these stages (comma separated, or all) under cProfile")
+    args = parser.parse_args()
+    profiling.configure(args.trace, args.profile)
+
+    with stage("load_data"):
+        df = load_grouped(["YEAR", "MONTH", "ORIGIN", "DEST", "PASSENGERS"])
+        df["DATE"] = pd.to_datetime(df["YEAR"].astype(str) + "-" + df["MONTH"].astype(str) + "-01")
+        df["ROUTE"] = df["ORIGIN"] + " → " + df["DEST"]
+
+    with stage("route_insights"):
+        generate_route_insights(df, n_jobs=args.jobs, holt_winters=args.holt_winters, panel=args.panel,
+                                incremental=args.incremental)
 
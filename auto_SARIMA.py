@@ -1,16 +1,11 @@
 import pandas as pd
 import plotly.express as px
 import numpy as np
-from statsmodels.tsa.seasonal import seasonal_decompose
 import plotly.graph_objects as go
-from scipy import stats
-from statsmodels.tsa.seasonal import STL
-from sklearn.metrics import mean_absolute_error
-from statsmodels.tsa.holtwinters import ExponentialSmoothing
-from sklearn.metrics import mean_absolute_error
+from datastore import load_grouped, route_month_series
 
-# Load airport metadata
-airports_df = pd.read_csv("airports.dat")
+# statsmodels, sklearn and statsforecast are imported inside the functions that fit models,
+# so that importing this module (e.g. by the dashboard) stays fast
 
 # Extract top N most frequent routes by passenger volume
 def compute_top_routes(df, top_n=10):
@@ -29,6 +24,8 @@ def compute_top_routes(df, top_n=10):
 
 # Plot long-term trend in passenger data
 def get_trend_plot(df):
+    from statsmodels.tsa.seasonal import seasonal_decompose
+
     fig = go.Figure()
     df = df.copy()
     df = df.sort_values('DATE')
@@ -106,21 +103,75 @@ def get_outliers_plot(df):
     fig.update_layout(title="Outliers in Passengers", xaxis_title="Date", yaxis_title="Passengers")
     return fig
 
-# Perform forecast evaluation per route using Holt-Winters and AutoARIMA
-def generate_route_insights(df):
+# Monthly passengers per route in StatsForecast's long format (unique_id, ds, y)
+def route_month_panel(df):
+    panel = route_month_series(df)
+    return panel.rename(columns={"ROUTE": "unique_id", "DATE": "ds", "PASSENGERS": "y"})
+
+
+# AutoARIMA forecasts of h months for all series of a panel in one StatsForecast call and their mean
+# absolute error against the actual values, indexed by route.
+# Routes without exactly h matching actual months get NaN.
+def panel_autoarima_mae(panel, actual, h):
     from statsforecast import StatsForecast
     from statsforecast.models import AutoARIMA
 
+    # One long panel with all routes, fitted in parallel by StatsForecast
+    sf = StatsForecast(models=[AutoARIMA(season_length=12)], freq="MS", n_jobs=-1)
+    forecast_df = sf.forecast(df=panel, h=h)
+    if "unique_id" not in forecast_df.columns:
+        forecast_df = forecast_df.reset_index()
+
+    # Auto-detect column name for the forecast
+    forecast_column = forecast_df.columns.difference(["unique_id", "ds"])[0]
+
+    # Join forecasts and actuals per route and month
+    merged = forecast_df.merge(actual, on=["unique_id", "ds"], how="inner")
+    merged["ABS_ERROR"] = (merged["y"] - merged[forecast_column]).abs()
+    errors = merged.groupby("unique_id")["ABS_ERROR"].agg(["mean", "size"])
+
+    actual_months = actual.groupby("unique_id").size().reindex(errors.index)
+    return errors["mean"].where((errors["size"] == h) & (actual_months == h))
+
+
+# Forecast 12 months for all routes with a single batched AutoARIMA call and
+# return the mean absolute error against the actual values, indexed by route.
+# If the batched call fails, the routes are fitted one by one and only the failing ones get NaN.
+def autoarima_mae(train_df, valid_df, h=12):
+    panel = route_month_panel(train_df)
+    actual = route_month_panel(valid_df)
+
+    try:
+        return panel_autoarima_mae(panel, actual, h)
+    except Exception as e:
+        print(f"Batched AutoARIMA failed ({e}), fitting the routes one by one.")
+
+    maes = {}
+    for route, route_panel in panel.groupby("unique_id", sort=False):
+        try:
+            maes[route] = panel_autoarima_mae(route_panel, actual[actual["unique_id"] == route], h).get(route, np.nan)
+        except Exception as e:
+            print(f"AutoARIMA error for {route}: {e}")
+            maes[route] = np.nan
+    return pd.Series(maes, dtype="float64")
+
+# Perform forecast evaluation per route using Holt-Winters and AutoARIMA
+def generate_route_insights(df):
+    from statsmodels.tsa.seasonal import STL
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+    from sklearn.metrics import mean_absolute_error
+
     insights = []
+    train_parts = []
+    valid_parts = []
 
     df["DATE"] = pd.to_datetime(df["DATE"])
     df["ROUTE"] = df["ORIGIN"] + " → " + df["DEST"]
 
-    all_routes = df["ROUTE"].unique()
-
-    for route in all_routes:
-        route_df = df[df["ROUTE"] == route].sort_values("DATE")
+    # One series per route and month for all metrics and both models, like analysis.py
+    monthly = route_month_series(df)
 
+    for route, route_df in monthly.groupby("ROUTE", sort=False, observed=True):
         if route_df["PASSENGERS"].isnull().any() or len(route_df) < 36:
             continue
 
@@ -163,30 +214,6 @@ def generate_route_insights(df):
             print(f"Holt-Winters error for {route}: {e}")
             mae_hw = np.nan
 
-        # AutoARIMA forecasting with StatsForecast
-        try:
-            train_sarima = route_df[route_df["DATE"] < "2024-01-01"]
-            valid_sarima = route_df[(route_df["DATE"] >= "2024-01-01") & (route_df["DATE"] < "2025-01-01")]
-
-            ts_sf = train_sarima.copy()
-            ts_sf = ts_sf.rename(columns={"DATE": "ds", "PASSENGERS": "y"})
-            ts_sf["unique_id"] = route
-
-            sf = StatsForecast(models=[AutoARIMA(season_length=12)], freq="MS", n_jobs=1)
-            forecast_df = sf.forecast(df=ts_sf, h=12)
-
-            # Auto-detect column name for the forecast
-            forecast_column = forecast_df.columns.difference(["unique_id", "ds"])[0]
-            forecast_sarima = forecast_df[forecast_column]
-
-            if len(forecast_sarima) == len(valid_sarima):
-                mae_sarima = mean_absolute_error(valid_sarima["PASSENGERS"].values, forecast_sarima.values)
-            else:
-                mae_sarima = np.nan
-        except Exception as e:
-            print(f"AutoARIMA error for {route}: {e}")
-            mae_sarima = np.nan
-
         # Append insights for the route
         insights.append({
             "route": route,
@@ -194,19 +221,36 @@ def generate_route_insights(df):
             "season_amp_pct": round(season_amp_pct, 1),
             "outlier_count": int(outliers),
             "mae_holt": round(mae_hw, 1) if not np.isnan(mae_hw) else np.nan,
-            "mae_sarima": round(mae_sarima, 1) if not np.isnan(mae_sarima) else np.nan,
             "quotient_holt": round(mae_hw / slope, 3) if (not np.isnan(mae_hw) and slope != 0) else np.nan,
-            "quotient_sarima": round(mae_sarima / slope, 3) if (not np.isnan(mae_sarima) and slope != 0) else np.nan
+            "slope": slope
         })
 
-    df_result = pd.DataFrame(insights)
+        # Collect the training and validation data for the batched AutoARIMA forecast
+        train_parts.append(route_df[route_df["DATE"] < "2024-01-01"])
+        valid_parts.append(route_df[(route_df["DATE"] >= "2024-01-01") & (route_df["DATE"] < "2025-01-01")])
+
+    df_result = pd.DataFrame(insights, columns=["route", "trend_slope", "season_amp_pct", "outlier_count",
+                                                "mae_holt", "quotient_holt", "slope"])
+
+    # AutoARIMA forecasting with StatsForecast, all routes in one batched call
+    if train_parts:
+        mae_sarima = df_result["route"].map(autoarima_mae(pd.concat(train_parts), pd.concat(valid_parts)))
+    else:
+        print("No route with at least 36 months, AutoARIMA skipped.")
+        mae_sarima = pd.Series(np.nan, index=df_result.index)
+
+    # Insert the AutoARIMA columns at their usual place
+    slope = df_result.pop("slope").astype("float64")
+    df_result.insert(df_result.columns.get_loc("mae_holt") + 1, "mae_sarima", mae_sarima.round(1))
+    df_result["quotient_sarima"] = (mae_sarima / slope.where(slope != 0)).round(3)
+
     df_result = df_result.sort_values("trend_slope", ascending=False).reset_index(drop=True)
     df_result.to_csv("Data/precomputed_route_insights.csv", index=False)
     return df_result
 
 # Main execution entrypoint for loading and processing data
 if __name__ == "__main__":
-    df = pd.read_csv("Data/Grouped_All_Valid_Connections.csv", low_memory=False)
+    df = load_grouped(["YEAR", "MONTH", "ORIGIN", "DEST", "PASSENGERS"])
     df["DATE"] = pd.to_datetime(df["YEAR"].astype(str) + "-" + df["MONTH"].astype(str) + "-01")
     df["ROUTE"] = df["ORIGIN"] + " → " + df["DEST"]
     generate_route_insights(df)
@@ -0,0 +1,235 @@
+#! /usr/bin/python3
+# Latency benchmark of the dashboard callbacks on synthetic data of growing size.
+#
+# For every scale (1x = as many connections as the current data, see synthetic.py) the grouped data is
+# generated into a temporary directory and a fresh process imports dashboard.py there and calls the
+# callback functions directly with random routes, airlines, years and months:
+#   update_all_graphs (historical "all" / single year, and forecasts with an empty forecast cache),
+#   update_kpis, update_airline_options, update_map and update_top_routes_visuals.
+# Reported per callback are p50/p95/mean latency and the peak memory allocated by one call (tracemalloc),
+# per scale the dashboard import time and the peak RSS of the process.
+# The results are written as JSON. With --compare the p95 latencies are compared to an earlier result
+# and the run fails if one got slower than --max-regression times.
+#
+#   python benchmarks/dashboard_callbacks.py [--scales 1 10 100] [--repeat 30] [--forecast-repeat 3]
+#                                            [--output FILE] [--compare OLD_FILE] [--max-regression 1.5]
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import warnings
+import tracemalloc
+import subprocess
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+def latency_summary(seconds):
+    ms = np.array(seconds) * 1000
+    return {
+        "n": len(ms),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "mean_ms": float(ms.mean()),
+    }
+
+
+# Peak memory in MB allocated by one call (everything tracemalloc sees, including NumPy buffers)
+def peak_allocation_mb(call):
+    tracemalloc.start()
+    try:
+        call()
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+# Runs in the measured process (cwd = directory with the synthetic data)
+def measure(repeat, forecast_repeat, seed):
+    start = time.perf_counter()
+    import dashboard
+    import_seconds = time.perf_counter() - start
+    # statsmodels registers its own warning filters when the first forecast imports it
+    warnings.simplefilter("ignore")
+
+    rng = np.random.default_rng(seed)
+    routes = [option["value"] for option in dashboard.route_options]
+    years = sorted(int(year) for year in dashboard.data["YEAR"].unique())
+
+    def pick(options):
+        return options[rng.integers(len(options))]
+
+    def random_route():
+        return pick(routes)
+
+    def random_airline(route):
+        origin, dest = route.split("-")
+        airlines = dashboard.route_index["airline_names"].get((origin, dest), [])
+        if not airlines or rng.random() < 0.5:
+            return "all"
+        return pick(airlines)
+
+    def graphs(year, clear_cache=False):
+        def args():
+            route = random_route()
+            return route, random_airline(route), year
+
+        def call(route, airline, selected_year):
+            if clear_cache:
+                dashboard.forecast_cache.clear()
+            return dashboard.update_all_graphs(route, airline, selected_year)
+        return call, args
+
+    def kpis_args():
+        route = random_route()
+        return route, random_airline(route), pick(["all"] + years)
+
+    def top_routes_args():
+        return pick(["all"] + years), pick(["all"] + list(range(1, 13)))
+
+    origins = [str(origin) for origin in dashboard.iata_codes]
+    scenarios = {
+        "update_all_graphs[all]": (*graphs("all"), repeat),
+        "update_all_graphs[year]": (*graphs(years[-1]), repeat),
+        "update_all_graphs[forecast]": (*graphs(f"forecast_{years[-1] + 1}", clear_cache=True), forecast_repeat),
+        "update_kpis": (dashboard.update_kpis, kpis_args, repeat),
+        "update_airline_options": (dashboard.update_airline_options, lambda: (random_route(),), repeat),
+        "update_map": (dashboard.update_map, lambda: (pick(origins),), repeat),
+        "update_top_routes_visuals": (dashboard.update_top_routes_visuals, top_routes_args, repeat),
+    }
+
+    callbacks = {}
+    for name, (function, make_args, n) in scenarios.items():
+        if n <= 0:
+            continue
+        # One warm-up call (lazy imports, first use of the caches)
+        function(*make_args())
+
+        seconds = []
+        for _ in range(n):
+            args = make_args()
+            start = time.perf_counter()
+            function(*args)
+            seconds.append(time.perf_counter() - start)
+
+        args = make_args()
+        callbacks[name] = {**latency_summary(seconds), "peak_alloc_mb": peak_allocation_mb(lambda: function(*args))}
+
+    return {
+        "rows": len(dashboard.data),
+        "routes": len(routes),
+        "import_seconds": import_seconds,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "callbacks": callbacks,
+    }
+
+
+def run_scale(scale, args):
+    from synthetic import BASE_CONNECTIONS, synthetic_grouped, write_dashboard_inputs
+
+    workdir = tempfile.mkdtemp(prefix=f"dashboard_bench_{scale}x_")
+    try:
+        df = synthetic_grouped(int(BASE_CONNECTIONS * scale), seed=args.seed)
+        write_dashboard_inputs(df, workdir, seed=args.seed)
+        del df
+
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, os.environ.get("PYTHONPATH", "")]))
+        command = [sys.executable, os.path.abspath(__file__), "--measure", "--repeat", str(args.repeat),
+                   "--forecast-repeat", str(args.forecast_repeat), "--seed", str(args.seed)]
+        result = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Benchmark at {scale}x failed:\n{result.stderr}")
+        return json.loads(result.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# p95 ratio new/old of every callback measured in both results
+def compare(result, previous, max_regression):
+    regressions = []
+    for scale, measured in result["scales"].items():
+        for name, stats in measured["callbacks"].items():
+            old = previous.get("scales", {}).get(scale, {}).get("callbacks", {}).get(name)
+            if old is None:
+                continue
+            ratio = stats["p95_ms"] / max(old["p95_ms"], 1e-3)
+            flag = "REGRESSION" if ratio > max_regression else ""
+            print(f"{scale:>5}x {name:<28} p95 {old['p95_ms']:9.1f} -> {stats['p95_ms']:9.1f} ms  x{ratio:5.2f} {flag}")
+            if flag:
+                regressions.append((scale, name))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard callbacks on synthetic data.")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=30, help="calls per callback")
+    parser.add_argument("--forecast-repeat", type=int, default=3, help="calls of the forecast view (fits models)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/dashboard_callbacks-<git revision>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare the p95 latencies with")
+    parser.add_argument("--max-regression", type=float, default=1.5, help="allowed p95 slowdown factor with --compare")
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.repeat, args.forecast_repeat, args.seed)))
+        return
+
+    import pandas as pd
+    revision = git_revision()
+    result = {
+        "benchmark": "dashboard_callbacks",
+        "revision": revision,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "cpus": os.cpu_count(),
+        "repeat": args.repeat,
+        "forecast_repeat": args.forecast_repeat,
+        "seed": args.seed,
+        "scales": {},
+    }
+    for scale in args.scales:
+        key = f"{scale:g}"
+        result["scales"][key] = run_scale(scale, args)
+        measured = result["scales"][key]
+        print(f"{key}x: {measured['rows']} rows, {measured['routes']} routes, "
+              f"import {measured['import_seconds']:.2f}s, peak RSS {measured['peak_rss_mb']:.0f} MB")
+        for name, stats in measured["callbacks"].items():
+            print(f"    {name:<28} p50 {stats['p50_ms']:9.1f} ms  p95 {stats['p95_ms']:9.1f} ms  "
+                  f"peak alloc {stats['peak_alloc_mb']:7.1f} MB")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"dashboard_callbacks-{revision}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        if compare(result, previous, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
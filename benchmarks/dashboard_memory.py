@@ -0,0 +1,90 @@
+#! /usr/bin/python3
+# Per-worker memory of the dashboard with the plain and the compact data (DASHBOARD_COMPACT_DATA) and
+# with the shared memory-mapped data written by shared_data.py (DASHBOARD_SHARED_DATA).
+#
+# Every gunicorn worker imports the dashboard. For every load path a fresh process imports dashboard.py
+# (from the repository root, with the data in Data/) and reports
+#   import_seconds    time to import the dashboard (load the data, build the indexes and the app)
+#   data_bytes        deep memory usage of the dashboard data frame
+#   rss_mb            resident memory of the process after the import
+#   private_dirty_mb  memory only this process can use; the mapped shared data is not part of it
+#   peak_rss_mb       peak resident memory of the process
+# The shared path is only measured if shared_data.py was run for the current data.
+#
+#   python benchmarks/dashboard_memory.py [--module dashboard]
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Environment of the dashboard process per load path
+MODES = {
+    "plain": {"DASHBOARD_COMPACT_DATA": "0", "DASHBOARD_SHARED_DATA": "0"},
+    "compact": {"DASHBOARD_COMPACT_DATA": "1", "DASHBOARD_SHARED_DATA": "0"},
+    "shared": {"DASHBOARD_SHARED_DATA": "1"},
+}
+
+
+# Memory of this process in MB from a /proc file (Linux), None where it is not available
+def proc_memory_mb(path, *fields):
+    try:
+        with open(path) as f:
+            values = dict(line.split(":", 1) for line in f if ":" in line)
+    except OSError:
+        return None
+    if not all(field in values for field in fields):
+        return None
+    return sum(int(values[field].split()[0]) for field in fields) / 1024
+
+
+# Runs in the measured process: import the dashboard and print its memory as JSON
+def measure(module):
+    sys.path.insert(0, ROOT)
+    start = time.perf_counter()
+    dashboard = __import__(module)
+    import_seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        "import_seconds": import_seconds,
+        "data_bytes": int(dashboard.data.memory_usage(deep=True).sum()),
+        "rows": len(dashboard.data),
+        "rss_mb": proc_memory_mb("/proc/self/status", "VmRSS"),
+        "private_dirty_mb": proc_memory_mb("/proc/self/smaps_rollup", "Private_Dirty"),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the dashboard worker memory with plain, compact and shared data.")
+    parser.add_argument("--module", default="dashboard", help="dashboard module to import (dashboard or dashboard_auto)")
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.module)
+        return
+
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    from shared_data import attach_shared_data
+
+    result = {}
+    for mode, mode_env in MODES.items():
+        if mode == "shared" and attach_shared_data() is None:
+            continue
+        env = dict(os.environ, **mode_env)
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--measure", "--module", args.module],
+                                env=env, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        result[mode] = json.loads(output.strip().splitlines()[-1])
+
+    result["data_ratio"] = result["compact"]["data_bytes"] / result["plain"]["data_bytes"]
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#! /usr/bin/python3
+# Import-time budget check for the dashboard modules.
+#
+# Every module is imported in a fresh interpreter (run from the repository root) and the
+# wall time of the import is measured. The check fails if an import takes longer than the
+# budget or if it pulls in one of the heavy modelling libraries, which must only be
+# imported when a forecast or insight is actually requested.
+#
+#   python benchmarks/import_time.py [--budget 1.5] [--repeat 3] [--modules analysis forecasting ...]
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be loaded at import time
+HEAVY_MODULES = ["statsmodels", "scipy", "sklearn", "statsforecast"]
+
+# Modules imported by the dashboard workers; the dashboards themselves also load the data
+DEFAULT_MODULES = ["forecasting", "analysis", "auto_SARIMA", "forecast_cache", "dashboard"]
+
+MEASURE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = sorted({{name.split(".")[0] for name in sys.modules}} & set({heavy!r}))
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def measure(module, repeat):
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", MEASURE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            return {"module": module, "error": result.stderr.strip().splitlines()[-1]}
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    return {
+        "module": module,
+        "seconds": min(run["seconds"] for run in runs),
+        "heavy": runs[0]["heavy"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time of the dashboard modules.")
+    parser.add_argument("--budget", type=float, default=1.5, help="maximum import time per module in seconds")
+    parser.add_argument("--repeat", type=int, default=3, help="imports per module, the fastest one counts")
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        result = measure(module, args.repeat)
+        if "error" in result:
+            print(f"{module:<16} SKIPPED  ({result['error']})")
+            continue
+
+        problems = []
+        if result["seconds"] > args.budget:
+            problems.append(f"over budget of {args.budget:.2f}s")
+        if result["heavy"]:
+            problems.append("imports " + ", ".join(result["heavy"]))
+
+        status = "FAIL" if problems else "ok"
+        print(f"{module:<16} {result['seconds']:.3f}s  {status}  {'; '.join(problems)}")
+        failed = failed or bool(problems)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
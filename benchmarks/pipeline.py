@@ -0,0 +1,164 @@
+#! /usr/bin/python3
+# End-to-end benchmark of the offline pipeline on synthetic raw data:
+#   Connection_473.py (eligible connections) -> preprocess.py (grouped data) -> analysis.py (route insights)
+#
+# For every size, yearly T-100 segment files of --rows rows each (all columns of the BTS download, see
+# synthetic.py) are generated into a temporary directory and every stage runs there as its own process,
+# in order, exactly as from the command line. Reported per stage are the wall time, the CPU time
+# (user + system, including worker processes), the peak RSS and the input rows per second (raw segment
+# rows for the first two stages, grouped rows for the analysis).
+# The results are written as JSON. With --compare the stage wall times are compared to an earlier result
+# and the run fails if one got slower than --max-regression times.
+#
+#   python benchmarks/pipeline.py [--rows 20000 100000] [--analysis-args="--holt-winters batch --panel"]
+#                                 [--output FILE] [--compare OLD_FILE] [--max-regression 1.5]
+import os
+import sys
+import json
+import time
+import shlex
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+GROUPED_CSV = "Data/Grouped_All_Valid_Connections.csv"
+
+
+def count_rows(path):
+    with open(path, "rb") as f:
+        return sum(1 for _ in f) - 1
+
+
+# Run one stage as a child process in workdir. wait4 gives the resource usage of just this child
+# (and the workers it waited for), so every stage gets its own CPU time and peak RSS.
+def run_stage(command, workdir, rows):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, os.environ.get("PYTHONPATH", "")]),
+               PYTHONWARNINGS="ignore")
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    output = process.stdout.read().decode(errors="replace")
+    _, status, usage = os.wait4(process.pid, 0)
+    wall_seconds = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} failed:\n{output}")
+
+    return {
+        "rows": rows,
+        "wall_seconds": wall_seconds,
+        "cpu_seconds": usage.ru_utime + usage.ru_stime,
+        "peak_rss_mb": usage.ru_maxrss / 1024,
+        "rows_per_second": rows / wall_seconds,
+    }
+
+
+def run_size(rows_per_year, args):
+    from synthetic import write_segment_files
+
+    workdir = tempfile.mkdtemp(prefix=f"pipeline_bench_{rows_per_year}_")
+    try:
+        start = time.perf_counter()
+        files = write_segment_files(workdir, rows_per_year, seed=args.seed)
+        generate_seconds = time.perf_counter() - start
+        raw_rows = sum(count_rows(os.path.join(workdir, path)) for path in files)
+
+        python = sys.executable
+        stages = {}
+        stages["Connection_473"] = run_stage([python, os.path.join(ROOT, "Connection_473.py"), *files], workdir, raw_rows)
+        stages["preprocess"] = run_stage([python, os.path.join(ROOT, "preprocess.py")], workdir, raw_rows)
+        grouped_rows = count_rows(os.path.join(workdir, GROUPED_CSV))
+        with open(os.path.join(workdir, "Data", "valid_routes.json")) as f:
+            routes = len(json.load(f))
+        stages["analysis"] = run_stage([python, os.path.join(ROOT, "analysis.py"), *shlex.split(args.analysis_args)],
+                                       workdir, grouped_rows)
+
+        return {
+            "raw_rows": raw_rows,
+            "grouped_rows": grouped_rows,
+            "routes": routes,
+            "generate_seconds": generate_seconds,
+            "stages": stages,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# Wall time ratio new/old of every stage measured in both results
+def compare(result, previous, max_regression):
+    regressions = []
+    for size, measured in result["sizes"].items():
+        for name, stats in measured["stages"].items():
+            old = previous.get("sizes", {}).get(size, {}).get("stages", {}).get(name)
+            if old is None:
+                continue
+            ratio = stats["wall_seconds"] / max(old["wall_seconds"], 1e-3)
+            flag = "REGRESSION" if ratio > max_regression else ""
+            print(f"{size:>9} {name:<15} {old['wall_seconds']:8.2f} -> {stats['wall_seconds']:8.2f} s  x{ratio:5.2f} {flag}")
+            if flag:
+                regressions.append((size, name))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Connection_473 -> preprocess -> analysis on synthetic raw data.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[20000], help="raw segment rows per yearly file")
+    parser.add_argument("--analysis-args", default="", help="extra arguments of analysis.py, e.g. \"--holt-winters batch\"")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/pipeline-<git revision>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare the stage wall times with")
+    parser.add_argument("--max-regression", type=float, default=1.5, help="allowed wall time slowdown factor with --compare")
+    args = parser.parse_args()
+
+    import pandas as pd
+    revision = git_revision()
+    result = {
+        "benchmark": "pipeline",
+        "revision": revision,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "cpus": os.cpu_count(),
+        "analysis_args": args.analysis_args,
+        "seed": args.seed,
+        "sizes": {},
+    }
+    for rows_per_year in args.rows:
+        key = str(rows_per_year)
+        result["sizes"][key] = measured = run_size(rows_per_year, args)
+        print(f"{rows_per_year} rows/year: {measured['raw_rows']} raw rows, {measured['grouped_rows']} grouped rows, "
+              f"{measured['routes']} routes (generated in {measured['generate_seconds']:.1f}s)")
+        for name, stats in measured["stages"].items():
+            print(f"    {name:<15} wall {stats['wall_seconds']:8.2f} s  cpu {stats['cpu_seconds']:8.2f} s  "
+                  f"peak RSS {stats['peak_rss_mb']:7.0f} MB  {stats['rows_per_second']:10.0f} rows/s")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{revision}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        if compare(result, previous, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#! /usr/bin/python3
+# Benchmark of the SARIMA refit in forecasting.sarima_forecast.
+#
+# The dashboard fits SARIMAX(1,1,1)(1,1,1,12) on 2022-2023 and refits it on 2022-2024. For a set of
+# synthetic monthly series the refit is run
+#   before        default start values with parameter covariance (the previous implementation)
+#   cold          default start values without parameter covariance (what sarima_forecast does)
+#   warm          started from the parameters of the first fit
+#   append        2024 appended to the first fit (state-space append), its parameters are kept
+#   append_refit  2024 appended to the first fit and refitted from its parameters
+# Reported are the optimizer iterations, the wall time of the refits, the difference of the 2025
+# forecasts to the previous implementation (relative to the mean of the series) and the log-likelihood
+# difference. The check fails if the forecasts of the shipped variant (cold) are not within the
+# tolerance of the previous ones.
+#
+# On 30 series (seed 0) append takes about 1/18 of the time of a cold refit, but its forecasts are
+# a median 12% of the series mean away from the full fit. warm and append_refit are the same fit: no
+# faster than cold, and forecasts a median 3% away at a lower log-likelihood. So sarima_forecast
+# refits cold.
+#
+#   python benchmarks/sarima_warm_start.py [--series 30] [--tolerance 0.001]
+import os
+import sys
+import time
+import json
+import argparse
+import warnings
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+VARIANTS = ["before", "cold", "warm", "append", "append_refit"]
+# Refit variant of sarima_forecast, the check is run on it
+SHIPPED = "cold"
+
+
+# Monthly series 2022-2024 with level, trend, yearly seasonality and noise
+def synthetic_series(rng, n_months=36):
+    months = np.arange(n_months)
+    level = rng.uniform(2_000, 50_000)
+    trend = level * rng.uniform(-0.005, 0.02) * months
+    season = level * rng.uniform(0.05, 0.3) * np.sin(2 * np.pi * (months + rng.integers(12)) / 12)
+    noise = level * rng.uniform(0.01, 0.08) * rng.standard_normal(n_months)
+    return pd.Series(np.maximum(level + trend + season + noise, 0.0))
+
+
+def refits(series):
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+    first = SARIMAX(series.iloc[:24], order=(1, 1, 1), seasonal_order=(1, 1, 1, 12)).fit(cov_type="none", disp=False)
+    model = SARIMAX(series, order=(1, 1, 1), seasonal_order=(1, 1, 1, 12))
+    fit_kwargs = {
+        "before": {},
+        "cold": {"cov_type": "none"},
+        "warm": {"start_params": first.params, "cov_type": "none"},
+    }
+
+    results = {}
+    for variant in VARIANTS:
+        start = time.perf_counter()
+        if variant == "append":
+            fit = first.append(series.iloc[24:])
+        elif variant == "append_refit":
+            fit = first.append(series.iloc[24:], refit=True, fit_kwargs={"cov_type": "none", "disp": False})
+        else:
+            fit = model.fit(disp=False, **fit_kwargs[variant])
+        forecast = fit.get_forecast(steps=12).predicted_mean.values
+        results[variant] = {
+            "seconds": time.perf_counter() - start,
+            "iterations": int(getattr(fit, "mle_retvals", {}).get("iterations", 0)),
+            "llf": fit.llf,
+            "forecast": forecast,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cold and warm-started SARIMA refits.")
+    parser.add_argument("--series", type=int, default=30, help="number of synthetic series")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=0.001,
+                        help="maximum forecast difference of the default refit relative to the series mean")
+    args = parser.parse_args()
+
+    # statsmodels registers its own warning filters on import
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+    warnings.simplefilter("ignore")
+    rng = np.random.default_rng(args.seed)
+
+    runs = []
+    failed = 0
+    for _ in range(args.series):
+        series = synthetic_series(rng)
+        # sarima_forecast reports failed fits as error text, they are left out here
+        try:
+            results = refits(series)
+        except Exception:
+            failed += 1
+            continue
+
+        for variant in VARIANTS:
+            results[variant]["difference"] = (
+                np.max(np.abs(results[variant]["forecast"] - results["before"]["forecast"])) / series.mean())
+        runs.append(results)
+
+    summary = {"series": args.series, "failed_fits": failed}
+    for variant in VARIANTS:
+        summary[variant] = {
+            "seconds": sum(run[variant]["seconds"] for run in runs),
+            "mean_iterations": float(np.mean([run[variant]["iterations"] for run in runs])),
+            "median_forecast_difference": float(np.median([run[variant]["difference"] for run in runs])),
+            "max_forecast_difference": float(np.max([run[variant]["difference"] for run in runs])),
+            "median_llf_difference": float(np.median([run[variant]["llf"] - run["before"]["llf"] for run in runs])),
+        }
+    print(json.dumps(summary, indent=2))
+
+    sys.exit(0 if summary[SHIPPED]["max_forecast_difference"] <= args.tolerance else 1)
+
+
+if __name__ == "__main__":
+    main()
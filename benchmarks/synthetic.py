@@ -0,0 +1,232 @@
+# Synthetic flight data for the benchmarks.
+#
+# Connections (airline, carrier entity, origin, destination, aircraft type) between real airports of
+# airports.dat, with monthly passengers following a trend, yearly seasonality and noise over 2022-2024.
+# 1x has as many connections as the current data (BASE_CONNECTIONS); larger scales add routes, airports
+# and airlines in proportion.
+import os
+import json
+import math
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+YEARS = [2022, 2023, 2024]
+
+# Connections of the current dataset
+BASE_CONNECTIONS = 473
+
+AIRCRAFT_TYPES = [614, 622, 626, 627, 634, 637, 638, 673, 691, 694, 819, 822]
+
+
+# Airports with IATA code and coordinates
+def load_airports():
+    airports = pd.read_csv(os.path.join(ROOT, "airports.dat"), header=None, usecols=[4, 6, 7],
+                           names=["IATA", "Latitude", "Longitude"])
+    airports = airports[airports["IATA"].str.fullmatch(r"[A-Z]{3}", na=False)]
+    return airports.drop_duplicates("IATA").reset_index(drop=True)
+
+
+# One row per connection with its keys, airline name and airport coordinates
+def synthetic_connections(n_connections, seed=0):
+    rng = np.random.default_rng(seed)
+    scale = n_connections / BASE_CONNECTIONS
+
+    airports = load_airports()
+    airports = airports.iloc[rng.choice(len(airports), min(len(airports), int(120 * math.sqrt(scale))), replace=False)]
+    airports = airports.reset_index(drop=True)
+
+    # About three connections (airlines / aircraft types) per route
+    n_routes = max(1, n_connections // 3)
+    pairs = rng.integers(len(airports), size=(4 * n_routes, 2))
+    pairs = pd.DataFrame(pairs[pairs[:, 0] != pairs[:, 1]]).drop_duplicates().to_numpy()[:n_routes]
+
+    n_airlines = max(5, int(40 * math.sqrt(scale)))
+    con = pd.DataFrame({
+        "route": rng.integers(len(pairs), size=2 * n_connections),
+        "AIRLINE_ID": 19000 + rng.integers(n_airlines, size=2 * n_connections),
+        "AIRCRAFT_TYPE": rng.choice(AIRCRAFT_TYPES, size=2 * n_connections),
+    })
+    con = con.drop_duplicates().head(n_connections).reset_index(drop=True)
+
+    origin = airports.iloc[pairs[con["route"], 0]].reset_index(drop=True)
+    dest = airports.iloc[pairs[con["route"], 1]].reset_index(drop=True)
+    return pd.DataFrame({
+        "AIRLINE_ID": con["AIRLINE_ID"],
+        "UNIQUE_CARRIER_ENTITY": (con["AIRLINE_ID"] % 97 + 10000).astype(str),
+        "UNIQUE_CARRIER_NAME": "Airline " + con["AIRLINE_ID"].astype(str),
+        "ORIGIN": origin["IATA"],
+        "DEST": dest["IATA"],
+        "AIRCRAFT_TYPE": con["AIRCRAFT_TYPE"],
+        "ORIGIN_LAT": origin["Latitude"],
+        "ORIGIN_LON": origin["Longitude"],
+        "DEST_LAT": dest["Latitude"],
+        "DEST_LON": dest["Longitude"],
+    })
+
+
+# Monthly passengers, seats and departures of every connection, arrays of shape (connections, months)
+def synthetic_traffic(n_connections, n_months, seed=0):
+    rng = np.random.default_rng(seed + 1)
+    months = np.arange(n_months)
+    level = rng.lognormal(8.5, 0.8, (n_connections, 1))
+    trend = rng.uniform(-0.005, 0.015, (n_connections, 1)) * months
+    season = rng.uniform(0.05, 0.3, (n_connections, 1)) * np.sin(2 * np.pi * (months + rng.integers(12, size=(n_connections, 1))) / 12)
+    noise = rng.normal(0, 0.05, (n_connections, n_months))
+
+    passengers = np.round(np.maximum(level * (1 + trend + season + noise), 0))
+    seats = np.ceil(passengers / rng.uniform(0.6, 0.95, (n_connections, 1)))
+    departures = np.maximum(np.round(seats / rng.choice([150, 180, 250, 300], size=(n_connections, 1))), 1)
+    return passengers, seats, departures
+
+
+# Data shaped like Grouped_All_Valid_Connections (the columns the dashboards and analysis use):
+# one row per connection and month of YEARS
+def synthetic_grouped(n_connections, seed=0):
+    con = synthetic_connections(n_connections, seed)
+    n_months = 12 * len(YEARS)
+    passengers, seats, departures = synthetic_traffic(len(con), n_months, seed)
+
+    df = con.loc[con.index.repeat(n_months)].reset_index(drop=True)
+    df.insert(0, "con_key", df["AIRLINE_ID"].astype(str) + "-" + df["UNIQUE_CARRIER_ENTITY"] + "-" +
+              df["ORIGIN"] + "-" + df["DEST"] + "-" + df["AIRCRAFT_TYPE"].astype(str))
+    df["YEAR"] = np.tile(np.repeat(YEARS, 12), len(con))
+    df["MONTH"] = np.tile(np.arange(1, 13), len(con) * len(YEARS))
+    df["PASSENGERS"] = passengers.ravel()
+    df["SEATS"] = seats.ravel()
+    df["DEPARTURES_PERFORMED"] = departures.ravel()
+    df["AVG_PAX_PER_FLIGHT"] = np.ceil(df["PASSENGERS"] / df["DEPARTURES_PERFORMED"]).astype("int64")
+    df["LOAD_FACTOR"] = df["PASSENGERS"] / df["SEATS"]
+    return df
+
+
+# Write everything the dashboards read at startup into workdir: the grouped Parquet dataset, the route
+# options and route insights (random values, with input hashes as analysis.py writes them).
+# airports.dat is linked into workdir.
+def write_dashboard_inputs(df, workdir, seed=0):
+    from datastore import GROUPED_DATASET, write_grouped
+
+    rng = np.random.default_rng(seed + 2)
+    os.makedirs(os.path.join(workdir, "Data"), exist_ok=True)
+    airports_link = os.path.join(workdir, "airports.dat")
+    if not os.path.exists(airports_link):
+        os.symlink(os.path.join(ROOT, "airports.dat"), airports_link)
+
+    write_grouped(df, os.path.join(workdir, GROUPED_DATASET))
+
+    routes = df[["ORIGIN", "DEST"]].drop_duplicates().sort_values(["ORIGIN", "DEST"])
+    with open(os.path.join(workdir, "Data", "valid_routes.json"), "w") as f:
+        json.dump([{"label": f"{origin} → {dest}", "value": f"{origin}-{dest}"}
+                   for origin, dest in routes.itertuples(index=False)], f)
+
+    n = len(routes)
+    insights = pd.DataFrame({
+        "route": (routes["ORIGIN"] + " → " + routes["DEST"]).to_numpy(),
+        "trend_slope": rng.normal(10, 50, n).round(2),
+        "season_amp_pct": rng.uniform(5, 60, n).round(1),
+        "outlier_count": rng.integers(0, 4, n),
+        "mae_holt": rng.uniform(100, 5000, n).round(1),
+        "mae_sarima": rng.uniform(100, 5000, n).round(1),
+    })
+    insights["quotient_holt"] = (insights["mae_holt"] / insights["trend_slope"]).round(3)
+    insights["quotient_sarima"] = (insights["mae_sarima"] / insights["trend_slope"]).round(3)
+    insights["input_hash"] = [f"{i:016x}" for i in rng.integers(2 ** 62, size=n)]
+    insights.to_csv(os.path.join(workdir, "Data", "precomputed_route_insights.csv"), index=False)
+
+
+# Raw segment rows (T_T100I_SEGMENT format, all columns of ingest.SEGMENT_DTYPES) of one year.
+# Most connections fly every month with enough passengers per departure to pass the eligibility check,
+# the others miss months or fly too small. About `rows` rows, at least one per connection and flown month.
+def synthetic_segments(con, year, rows, seed=0):
+    from ingest import SEGMENT_DTYPES
+
+    rng = np.random.default_rng(seed + year)
+    n_con = len(con)
+
+    # Flown months: all for regular connections, some missing for the others
+    regular = rng.random(n_con) < 0.8
+    flown = np.ones((n_con, 12), dtype=bool)
+    flown[~regular] = rng.random(((~regular).sum(), 12)) < 0.8
+    con_idx, month_idx = np.nonzero(flown)
+
+    # One row per flown month, the remaining rows spread randomly (e.g. several service classes)
+    extra = rng.integers(len(con_idx), size=max(0, rows - len(con_idx)))
+    cells = np.sort(np.concatenate([np.arange(len(con_idx)), extra]))
+    con_idx, month = con_idx[cells], month_idx[cells] + 1
+
+    season = 1 + 0.2 * np.sin(2 * np.pi * (month + con_idx % 12) / 12)
+    pax_per_departure = np.where(rng.random(n_con) < 0.75, rng.uniform(110, 300, n_con), rng.uniform(60, 130, n_con))
+    departures = np.maximum(np.round(rng.uniform(5, 60, n_con)[con_idx] * season * rng.uniform(0.8, 1.2, len(cells))), 1)
+    passengers = np.round(departures * pax_per_departure[con_idx] * rng.uniform(0.9, 1.1, len(cells)))
+    seats = np.ceil(passengers / rng.uniform(0.6, 0.95, len(cells)))
+    distance = rng.uniform(300, 8000, n_con)[con_idx].round()
+
+    c = con.iloc[con_idx].reset_index(drop=True)
+    origin_id = 10000 + c["ORIGIN"].map(lambda code: sum(ord(ch) for ch in code) * 7 % 90000)
+    dest_id = 10000 + c["DEST"].map(lambda code: sum(ord(ch) for ch in code) * 7 % 90000)
+    carrier = "C" + (c["AIRLINE_ID"] % 1000).astype(str)
+    df = pd.DataFrame({
+        "DEPARTURES_SCHEDULED": departures,
+        "DEPARTURES_PERFORMED": departures,
+        "PAYLOAD": seats * 95.0,
+        "SEATS": seats,
+        "PASSENGERS": passengers,
+        "FREIGHT": rng.uniform(0, 50000, len(cells)).round(),
+        "MAIL": rng.uniform(0, 2000, len(cells)).round(),
+        "DISTANCE": distance,
+        "RAMP_TO_RAMP": (distance / 8 + 30) * departures,
+        "AIR_TIME": distance / 8 * departures,
+        "UNIQUE_CARRIER": carrier,
+        "AIRLINE_ID": c["AIRLINE_ID"],
+        "UNIQUE_CARRIER_NAME": c["UNIQUE_CARRIER_NAME"],
+        "UNIQUE_CARRIER_ENTITY": c["UNIQUE_CARRIER_ENTITY"],
+        "REGION": "I",
+        "CARRIER": carrier,
+        "CARRIER_NAME": c["UNIQUE_CARRIER_NAME"],
+        "CARRIER_GROUP": 0,
+        "CARRIER_GROUP_NEW": 0,
+        "ORIGIN_AIRPORT_ID": origin_id,
+        "ORIGIN_AIRPORT_SEQ_ID": origin_id * 100 + 1,
+        "ORIGIN_CITY_MARKET_ID": origin_id + 20000,
+        "ORIGIN": c["ORIGIN"],
+        "ORIGIN_CITY_NAME": c["ORIGIN"] + " City",
+        "ORIGIN_COUNTRY": "XX",
+        "ORIGIN_COUNTRY_NAME": "Country",
+        "ORIGIN_WAC": 900,
+        "DEST_AIRPORT_ID": dest_id,
+        "DEST_AIRPORT_SEQ_ID": dest_id * 100 + 1,
+        "DEST_CITY_MARKET_ID": dest_id + 20000,
+        "DEST": c["DEST"],
+        "DEST_CITY_NAME": c["DEST"] + " City",
+        "DEST_COUNTRY": "XX",
+        "DEST_COUNTRY_NAME": "Country",
+        "DEST_WAC": 900,
+        "AIRCRAFT_GROUP": 6,
+        "AIRCRAFT_TYPE": c["AIRCRAFT_TYPE"],
+        "AIRCRAFT_CONFIG": 1,
+        "YEAR": year,
+        "QUARTER": (month - 1) // 3 + 1,
+        "MONTH": month,
+        "DISTANCE_GROUP": np.minimum(distance // 500 + 1, 11).astype(int),
+        "CLASS": rng.choice(["F", "G"], len(cells), p=[0.9, 0.1]),
+    })
+    return df[list(SEGMENT_DTYPES)]
+
+
+# Write yearly segment files Data/T_T100I_SEGMENT_ALL_CARRIER_<year>.csv (the names preprocess.py
+# reads) with about rows_per_year rows each into workdir. Returns the paths relative to workdir.
+def write_segment_files(workdir, rows_per_year, seed=0):
+    os.makedirs(os.path.join(workdir, "Data"), exist_ok=True)
+    airports_link = os.path.join(workdir, "airports.dat")
+    if not os.path.exists(airports_link):
+        os.symlink(os.path.join(ROOT, "airports.dat"), airports_link)
+
+    # About 1.3 rows per connection and month
+    con = synthetic_connections(max(10, int(rows_per_year / 12 / 1.3)), seed)
+    paths = []
+    for year in YEARS:
+        path = os.path.join("Data", f"T_T100I_SEGMENT_ALL_CARRIER_{year}.csv")
+        synthetic_segments(con, year, rows_per_year, seed).to_csv(os.path.join(workdir, path), index=False)
+        paths.append(path)
+    return paths
@@ -1,20 +1,50 @@
+import os
+import time
 import dash
 from dash import dcc, html, Input, Output, dash_table
 import pandas as pd
-from scipy import stats
 import json
 import plotly.graph_objects as go
 import plotly.express as px
 from auto_SARIMA import compute_top_routes, get_outliers_plot, get_seasonality_plot, get_trend_plot , generate_route_insights
 from forecasting import forecast_passengers, forecast_load_factor,get_forecast_for_year, sarima_forecast, prepare_forecast_data, sarima_forecast_load_factor
-from preprocess import iata_to_name
+from forecasting import build_route_index, lookup_route_rows
+from preprocess import iata_to_name, load_factor
+from datastore import dataset_fingerprint
+from forecast_cache import ForecastCache, disk_cache
+from forecast_store import load_forecast_store
+from top_routes import build_top_routes_cube, top_routes
+from shared_data import attach_shared_data, load_dashboard_data
+import dashboard_metrics
+from dashboard_metrics import timed_callback
 import warnings
 warnings.filterwarnings("ignore", category=FutureWarning)
 
 
-# Load and preprocess data
-data = pd.read_csv("Data/Grouped_All_Valid_Connections.csv", dtype={14: str})
-data["DATE"] = pd.to_datetime(data["YEAR"].astype(str) + "-" + data["MONTH"].astype(str) + "-01")
+# Every worker process holds its own copy of the data, so it is kept compact: strings as categoricals and
+# numbers downcast (see datastore.compact_grouped). DASHBOARD_COMPACT_DATA=0 loads the plain data instead.
+COMPACT_DATA = os.environ.get("DASHBOARD_COMPACT_DATA", "1") != "0"
+
+# With the shared files written by shared_data.py (and up to date) all workers map the same data
+# read-only instead. DASHBOARD_SHARED_DATA=0 ignores them.
+SHARED_DATA = os.environ.get("DASHBOARD_SHARED_DATA", "1") != "0"
+
+# Load the data, sorted by route and airline once (stable, rows inside each slice keep their order),
+# and index the slices, so callbacks only do lookups.
+# data_version identifies the loaded data (the files are fingerprinted once, before loading them).
+load_start = time.perf_counter()
+data_version = dataset_fingerprint()
+data = attach_shared_data() if SHARED_DATA else None
+data_source = "shared"
+if data is None:
+    data = load_dashboard_data(compact=COMPACT_DATA)
+    data_source = "compact" if COMPACT_DATA else "plain"
+route_index = build_route_index(data)
+
+# Passengers and seats per year, month and route (with roll-ups) for the top routes views
+top_routes_cube = build_top_routes_cube(data)
+dashboard_metrics.set_gauge("dashboard_data_load_seconds", time.perf_counter() - load_start, source=data_source)
+dashboard_metrics.set_gauge("dashboard_data_rows", len(data))
 
 with open("Data/valid_routes.json") as f:
     route_options = json.load(f)
@@ -31,17 +61,60 @@ data = data[(data["SEATS"] > 0) & (data["PASSENGERS"] > 0)]
 '''
 
 # Load precomputed route insights and select the top 10 routes with the highest increasing trend
-route_insights_df = pd.read_csv("Data/precomputed_route_insights.csv")
+# (without the input hashes of the incremental refresh, they are not shown and not sent to the browser)
+route_insights_df = pd.read_csv("Data/precomputed_route_insights.csv").drop(columns="input_hash", errors="ignore")
 top_routes_df = route_insights_df.sort_values("trend_slope", ascending=False).head(10)
 
 
+# Forecasts precomputed by forecast_store.py (None if missing or stale); forecast views are lookups then
+forecast_store = load_forecast_store()
+
+
+# Forecast from the store if it has it, otherwise compute() it on demand
+def stored_forecast(route, airline, model, target_year, compute):
+    if forecast_store is not None:
+        stored = forecast_store.get(route, airline, model, target_year)
+        if stored is not None:
+            dashboard_metrics.inc("dashboard_forecast_store_requests_total", result="hit")
+            return stored
+        dashboard_metrics.inc("dashboard_forecast_store_requests_total", result="miss")
+    return compute()
+
 # Get all unique origin IATA codes used in the dataset
 iata_codes = data["ORIGIN"].dropna().unique()
 
+# Forecast views run as background callbacks in separate processes, so a long SARIMA fit doesn't block
+# a server thread. Results are cached on disk per input and data version, identical requests are served
+# from there. Without diskcache (and its multiprocess/psutil dependencies) the callbacks run synchronously.
+BACKGROUND_CACHE_DIR = "cache/background"
+# Every background job runs in a new process, so the fitted forecasts are shared on disk between the
+# jobs (and the server workers) instead of in the memory of one process.
+FORECAST_CACHE_DIR = "cache/forecasts"
+try:
+    import diskcache
+    background_callback_manager = dash.DiskcacheManager(
+        diskcache.Cache(BACKGROUND_CACHE_DIR),
+        cache_by=[lambda: data_version],
+        expire=24 * 60 * 60
+    )
+    forecast_disk_cache = disk_cache(FORECAST_CACHE_DIR)
+except ImportError:
+    background_callback_manager = None
+    forecast_disk_cache = None
+
+# Fitted forecasts per route, airline, model and year of the loaded data (LRU in memory, and on disk if available)
+forecast_cache = ForecastCache(data_version, disk=forecast_disk_cache)
+
 # Initialize Dash app 
-app = dash.Dash(__name__)
+app = dash.Dash(__name__, background_callback_manager=background_callback_manager)
 app.title = "Flight Dashboard"
 
+# Callback latencies, forecast fits, payload sizes and load time in Prometheus format on /metrics
+dashboard_metrics.install(app)
+
+# WSGI application for production servers (see serve.py)
+server = app.server
+
 # App layout 
 app.layout = html.Div(
     #'backgroundColor': '#111111'black
@@ -144,6 +217,11 @@ app.layout = html.Div(
                     }),
                 ]),
             
+                # Progress of a running forecast
+                html.Div(id='forecast-status', style={'display': 'none', 'marginBottom': '10px', 'fontWeight': 'bold'}),
+                # Forecast selection handed to the background callback
+                dcc.Store(id='forecast-request'),
+
                 # Graph
                 dcc.Tabs(
                     [
@@ -356,10 +434,40 @@ app.layout = html.Div(
     ]
 )            
 
+# Precompute the map geometry of every origin airport: one line per distinct destination
+# (separated by None gaps, so all lines fit into one trace) and the destination markers
+def build_route_map_geometry(df):
+    pairs = df.drop_duplicates(["ORIGIN", "DEST"])[["ORIGIN", "DEST", "ORIGIN_LAT", "ORIGIN_LON", "DEST_LAT", "DEST_LON"]]
+
+    geometry = {}
+    for origin, routes in pairs.groupby("ORIGIN", sort=False, observed=True):
+        origin_lon = routes["ORIGIN_LON"].iloc[0]
+        origin_lat = routes["ORIGIN_LAT"].iloc[0]
+        line_lon, line_lat, line_text = [], [], []
+        for dest, dest_lon, dest_lat in zip(routes["DEST"], routes["DEST_LON"], routes["DEST_LAT"]):
+            text = f"{iata_to_name.get(origin, origin)} → {iata_to_name.get(dest, dest)}"
+            line_lon += [origin_lon, dest_lon, None]
+            line_lat += [origin_lat, dest_lat, None]
+            line_text += [text, text, None]
+
+        geometry[origin] = {
+            "origin_lon": origin_lon,
+            "origin_lat": origin_lat,
+            "line_lon": line_lon,
+            "line_lat": line_lat,
+            "line_text": line_text,
+            "dest_lon": routes["DEST_LON"].tolist(),
+            "dest_lat": routes["DEST_LAT"].tolist(),
+        }
+    return geometry
+
+route_map_geometry = build_route_map_geometry(data)
+
 @app.callback(
     Output("route-map", "figure"),
     Input("origin-dropdown", "value")
 )
+@timed_callback()
 def update_map(selected_origin):
     
     fig = go.Figure()
@@ -375,56 +483,39 @@ def update_map(selected_origin):
     ))
 
     # If a departure airport is selected:
-    if selected_origin:
-        filtered = data[data["ORIGIN"] == selected_origin]
-
+    geometry = route_map_geometry.get(selected_origin) if selected_origin else None
+    if geometry is not None:
         # Mark starting point (visible)
-        start_row = filtered.iloc[0] if not filtered.empty else None
-        if start_row is not None:
-            fig.add_trace(go.Scattergeo(
-                lon=[start_row["ORIGIN_LON"]],
-                lat=[start_row["ORIGIN_LAT"]],
-                mode='markers',
-                showlegend=False,
-                marker=dict(size=10, color='limegreen'),
-                name="Start"
-            ))
-
-        for _, row in filtered.iterrows():
-            # Line
-            fig.add_trace(go.Scattergeo(
-                lon=[row["ORIGIN_LON"], row["DEST_LON"]],
-                lat=[row["ORIGIN_LAT"], row["DEST_LAT"]],
-                mode='lines',
-                line=dict(width=1, dash='dot', color='cyan'),
-                opacity=0.6,
-                hoverinfo='text',
-                showlegend=False,
-                text=f"{iata_to_name.get(row['ORIGIN'], row['ORIGIN'])} → {iata_to_name.get(row['DEST'], row['DEST'])}"
-            ))
-            
-            # Target marker
-            fig.add_trace(go.Scattergeo(
-                lon=[row["DEST_LON"]],
-                lat=[row["DEST_LAT"]],
-                mode='markers',
-                marker=dict(size=8, color='red'),
-                showlegend=False,
-                hoverinfo='skip'
-            ))
-            '''
-            # Airplane (funktioniert auch noch nicht richtig...)
-            mid_lat = (row["ORIGIN_LAT"] + row["DEST_LAT"]) / 2
-            mid_lon = (row["ORIGIN_LON"] + row["DEST_LON"]) / 2
-            fig.add_trace(go.Scattergeo(
-                lon=[mid_lon],
-                lat=[mid_lat],
-                mode='text',
-                text='✈',
-                textfont=dict(size=20, color='white'),
-                showlegend=False
-            ))
-            '''
+        fig.add_trace(go.Scattergeo(
+            lon=[geometry["origin_lon"]],
+            lat=[geometry["origin_lat"]],
+            mode='markers',
+            showlegend=False,
+            marker=dict(size=10, color='limegreen'),
+            name="Start"
+        ))
+
+        # All routes as one line trace, separated by gaps
+        fig.add_trace(go.Scattergeo(
+            lon=geometry["line_lon"],
+            lat=geometry["line_lat"],
+            mode='lines',
+            line=dict(width=1, dash='dot', color='cyan'),
+            opacity=0.6,
+            hoverinfo='text',
+            showlegend=False,
+            text=geometry["line_text"]
+        ))
+
+        # All target markers as one trace
+        fig.add_trace(go.Scattergeo(
+            lon=geometry["dest_lon"],
+            lat=geometry["dest_lat"],
+            mode='markers',
+            marker=dict(size=8, color='red'),
+            showlegend=False,
+            hoverinfo='skip'
+        ))
             
     # Geo settings (no border, no labels)
     fig.update_geos(
@@ -460,13 +551,13 @@ def update_map(selected_origin):
     Output('airline-selector', 'value'),
     Input('route-selector', 'value')
 )
+@timed_callback()
 def update_airline_options(selected_route):
     if not selected_route:
         return [], "all"
 
     origin, dest = selected_route.split('-')
-    filtered = data[(data["ORIGIN"] == origin) & (data["DEST"] == dest)]
-    airlines = sorted(filtered["UNIQUE_CARRIER_NAME"].dropna().unique())
+    airlines = route_index["airline_names"].get((origin, dest), [])
 
     options = [{"label": airline, "value": airline} for airline in airlines]
     options.append({"label": "All Airlines", "value": "all"})
@@ -480,28 +571,12 @@ def update_airline_options(selected_route):
     [Input('top-routes-year-selector', 'value'),
     Input('top-routes-month-selector', 'value')]
 )
+@timed_callback()
 def update_top_routes_visuals(selected_year, selected_month):
-    df_filtered = data.copy()
-
-    if selected_year != "all":
-        df_filtered = df_filtered[df_filtered["YEAR"] == int(selected_year)]
-
-    if selected_month!= "all":
-        df_filtered = df_filtered[df_filtered["MONTH"] == int(selected_month)]
-
-    df_filtered = df_filtered[df_filtered["SEATS"] > 0]
-    df_filtered["ROUTE"] = df_filtered["ORIGIN"] + " → " + df_filtered["DEST"]
-    df_filtered["LOAD_FACTOR"] = df_filtered["PASSENGERS"] / df_filtered["SEATS"]
-
-    top_routes = df_filtered.groupby("ROUTE", as_index=False).agg({
-        "PASSENGERS": "sum",
-        "SEATS": "sum"
-    })
-    top_routes["LOAD_FACTOR"] = top_routes["PASSENGERS"] / top_routes["SEATS"]
-    top_routes = top_routes.sort_values("PASSENGERS", ascending=False).head(3)
+    top3 = top_routes(top_routes_cube, selected_year, selected_month, n=3)
 
     fig = px.bar(
-        top_routes,
+        top3,
         x="ROUTE",
         y="PASSENGERS",
         #title="Top 3 Routes",
@@ -524,7 +599,7 @@ def update_top_routes_visuals(selected_year, selected_month):
     )
     fig.update_traces(
         marker=dict(
-            color=top_routes["PASSENGERS"],
+            color=top3["PASSENGERS"],
             colorscale="Blues",     
             #line=dict(width=0)
         ),
@@ -539,7 +614,7 @@ def update_top_routes_visuals(selected_year, selected_month):
             {"name": "Seats", "id": "SEATS", "type": "numeric", "format": {"specifier": ","}},
             {"name": "Load Factor", "id": "LOAD_FACTOR", "type": "numeric", "format": {"specifier": ".2%"}},
         ],
-        data=top_routes.to_dict("records"),
+        data=top3.to_dict("records"),
         style_table={'overflowX': 'auto'},
         style_cell={'backgroundColor': '#111111', 'color': 'white', 'padding': '8px'},
         style_header={'backgroundColor': '#222222', 'fontWeight': 'bold'}
@@ -547,18 +622,24 @@ def update_top_routes_visuals(selected_year, selected_month):
 
     return fig, table
 
+# Forecast year selections of the year selector
+def is_forecast_selection(selected_year):
+    return isinstance(selected_year, str) and selected_year.startswith("forecast")
+
+# Metric labels of a route/airline/year selection: the kind of view, not the route itself
+def selection_labels(route, airline, year, *args, **kwargs):
+    if is_forecast_selection(year):
+        view = "forecast"
+    elif year is None or year == "all":
+        view = "all_years"
+    else:
+        view = "year"
+    return {"view": view, "airline": "all" if not airline or airline == "all" else "single"}
+
 #Left: 
-@app.callback(
-    Output('trend-graph', 'figure'),
-    Output('seasonality-graph', 'figure'),
-    Output('outliers-graph', 'figure'),
-    Output('lf-graph', 'figure'),
-    Output('passenger-graph', 'figure'),
-    Input('route-selector', 'value'),
-    Input('airline-selector', 'value'),
-    Input('year-selector', 'value')
-)
-def update_all_graphs(selected_route, selected_airline, selected_year):
+# set_progress is called with a status text while forecasts are fitted (see the callback registration below)
+@timed_callback(labels=selection_labels)
+def update_all_graphs(selected_route, selected_airline, selected_year, set_progress=None):
     # Initial empty figures
     trend_fig = no_forecast_figure("No forecast available!")
     seasonality_fig = no_forecast_figure("No forecast available!")
@@ -571,7 +652,7 @@ def update_all_graphs(selected_route, selected_airline, selected_year):
         return trend_fig, seasonality_fig, outliers_fig, lf_fig, pax_fig
     
     origin, dest = selected_route.split('-')
-    filtered = prepare_forecast_data(data, f"{origin} → {dest}", selected_airline)
+    filtered = prepare_forecast_data(data, f"{origin} → {dest}", selected_airline, route_index=route_index)
     
     # Add DATE column if not present
     if 'DATE' not in filtered.columns:
@@ -580,8 +661,7 @@ def update_all_graphs(selected_route, selected_airline, selected_year):
 
     # Calculate load factor safely
     filtered = filtered.copy()
-    filtered['LOAD_FACTOR'] = filtered.apply(
-        lambda row: row['PASSENGERS'] / row['SEATS'] if row['SEATS'] > 0 else 0, axis=1)
+    filtered['LOAD_FACTOR'] = load_factor(filtered['PASSENGERS'], filtered['SEATS'])
 
     # If forecast selected, generate forecast data and plot
     if isinstance(selected_year, str) and (selected_year.startswith("forecast_") or selected_year == "forecast_all"):
@@ -591,30 +671,48 @@ def update_all_graphs(selected_route, selected_airline, selected_year):
             forecast_years = [int(selected_year.split('_')[1])]
 
         year_label = ', '.join(str(y) for y in forecast_years)
+
+        if set_progress is not None:
+            set_progress(f"⏳ Fitting Holt-Winters forecasts for {origin} → {dest} ...")
         
         
         # Holt Winter forecast:
         # Get forecast dataframe for the forecast_year
         
-        forecast_df = pd.concat([get_forecast_for_year(filtered, year) for year in forecast_years])
+        forecast_df = pd.concat([
+            stored_forecast(selected_route, selected_airline, "holt_winters", year,
+                            lambda year=year: forecast_cache.get_or_compute(
+                                selected_route, selected_airline, "holt_winters", year,
+                                lambda: get_forecast_for_year(filtered, year)))
+            for year in forecast_years])
 
         # Filter actual data for forecast year (if available)
         actual_df = filtered.copy()
 
         # SARIMA forecast
-        train_df, valid_df, sarima_2024_df, sarima_2025_df, err = sarima_forecast(filtered)
+        if set_progress is not None:
+            set_progress(f"⏳ Fitting SARIMA forecasts for {origin} → {dest} ...")
+        # One SARIMA run forecasts 2024 and 2025, only the forecast of the year is kept
+        def sarima_year_forecast(year):
+            train_df, valid_df, sarima_2024_df, sarima_2025_df, err = forecast_cache.get_or_compute(
+                selected_route, selected_airline, "sarima", 2025, lambda: sarima_forecast(filtered))
+            sarima_df = sarima_2024_df if year == 2024 else sarima_2025_df
+            return sarima_df[sarima_df["TYPE"] == f"Forecast {year}"]
+
         sarima_forecast_load_df = pd.concat([
-            sarima_forecast_load_factor(filtered, year) for year in forecast_years])
+            stored_forecast(selected_route, selected_airline, "sarima_load_factor", year,
+                            lambda year=year: forecast_cache.get_or_compute(
+                                selected_route, selected_airline, "sarima_load_factor", year,
+                                lambda: sarima_forecast_load_factor(filtered, year)))
+            for year in forecast_years])
          
 
         # Filter SARIMA Forecast for forecast_year
         
-        sarima_parts = []
-        if 2024 in forecast_years:
-            sarima_parts.append(sarima_2024_df[sarima_2024_df["TYPE"] == "Forecast 2024"])
-        if 2025 in forecast_years:
-            sarima_parts.append(sarima_2025_df[sarima_2025_df["TYPE"] == "Forecast 2025"])
-        sarima_forecast_df = pd.concat(sarima_parts, ignore_index=True)
+        sarima_forecast_df = pd.concat([
+            stored_forecast(selected_route, selected_airline, "sarima", year,
+                            lambda year=year: sarima_year_forecast(year))
+            for year in forecast_years], ignore_index=True)
 
         
         # Sort data before plotting
@@ -694,8 +792,7 @@ def update_all_graphs(selected_route, selected_airline, selected_year):
         })
         filtered_agg['DATE'] = pd.to_datetime(filtered_agg['YEAR'].astype(str) + '-' +
                                              filtered_agg['MONTH'].astype(str).str.zfill(2) + '-01')
-        filtered_agg['LOAD_FACTOR'] = filtered_agg.apply(
-            lambda row: row['PASSENGERS'] / row['SEATS'] if row['SEATS'] > 0 else 0, axis=1)
+        filtered_agg['LOAD_FACTOR'] = load_factor(filtered_agg['PASSENGERS'], filtered_agg['SEATS'])
 
         lf_fig.add_trace(go.Scatter(
             x=filtered_agg['DATE'], y=filtered_agg['LOAD_FACTOR'],
@@ -763,6 +860,60 @@ def update_all_graphs(selected_route, selected_airline, selected_year):
     return trend_fig, seasonality_fig, outliers_fig, lf_fig, pax_fig
 
 
+graph_outputs = [
+    Output('trend-graph', 'figure'),
+    Output('seasonality-graph', 'figure'),
+    Output('outliers-graph', 'figure'),
+    Output('lf-graph', 'figure'),
+    Output('passenger-graph', 'figure'),
+]
+graph_inputs = [
+    Input('route-selector', 'value'),
+    Input('airline-selector', 'value'),
+    Input('year-selector', 'value'),
+]
+
+if background_callback_manager is not None:
+    # Historical views are index lookups and stay synchronous, forecast selections are handed to the
+    # background callback through the forecast-request store.
+    @app.callback(
+        *graph_outputs,
+        Output('forecast-request', 'data'),
+        *graph_inputs
+    )
+    def update_all_graphs_sync(selected_route, selected_airline, selected_year):
+        if selected_route and is_forecast_selection(selected_year):
+            request = {"route": selected_route, "airline": selected_airline, "year": selected_year}
+            return (*[dash.no_update] * len(graph_outputs), request)
+        return (*update_all_graphs(selected_route, selected_airline, selected_year), dash.no_update)
+
+    # Runs in a background process. The year selector is disabled and a status is shown while it runs.
+    # A new forecast request of the same browser replaces the running job, Dash stops it. Changing the
+    # route or airline cancels it too, so a cleared selection isn't overwritten by the old forecast
+    # (the job of a new forecast request only starts after the synchronous callback has answered).
+    @app.callback(
+        *[Output(o.component_id, o.component_property, allow_duplicate=True) for o in graph_outputs],
+        Input('forecast-request', 'data'),
+        background=True,
+        progress=Output('forecast-status', 'children'),
+        running=[
+            (Output('forecast-status', 'style'), {'display': 'block', 'marginBottom': '10px', 'fontWeight': 'bold'}, {'display': 'none'}),
+            (Output('year-selector', 'disabled'), True, False),
+        ],
+        cancel=[Input('route-selector', 'value'), Input('airline-selector', 'value')],
+        prevent_initial_call=True
+    )
+    def update_all_graphs_background(set_progress, request):
+        set_progress("⏳ Loading ...")
+        try:
+            return update_all_graphs(request["route"], request["airline"], request["year"], set_progress=set_progress)
+        finally:
+            # The job process ends without exit handlers, write its metrics now
+            dashboard_metrics.flush(force=True)
+else:
+    app.callback(*graph_outputs, *graph_inputs)(update_all_graphs)
+
+
 def no_forecast_figure(message="No forecast available"):
     fig = go.Figure()
     fig.add_annotation(
@@ -790,20 +941,18 @@ def no_forecast_figure(message="No forecast available"):
     Input('airline-selector', 'value'),
     Input('year-selector', 'value')
 )
+@timed_callback(labels=selection_labels)
 def update_kpis(route, airline, year):
     if not route:
         return []
 
     origin, dest = route.split('-')
-    df = data[(data['ORIGIN'] == origin) & (data['DEST'] == dest)].copy()
-
-    if airline != "all":
-        df = df[df['UNIQUE_CARRIER_NAME'] == airline]
+    df = lookup_route_rows(route_index, origin, dest, airline)
 
     if year != "all" and isinstance(year, int):
         df = df[df['YEAR'] == year]
 
-    df['LOAD_FACTOR'] = df.apply(lambda row: row['PASSENGERS'] / row['SEATS'] if row['SEATS'] > 0 else 0, axis=1)
+    df = df.assign(LOAD_FACTOR=load_factor(df['PASSENGERS'], df['SEATS']))
 
     avg_lf = df['LOAD_FACTOR'].mean()
     max_pax = df['PASSENGERS'].max()
@@ -838,7 +987,7 @@ def update_kpis(route, airline, year):
     Input("sarima-button", "n_clicks"),
     prevent_initial_call=True
 )
-
+@timed_callback()
 def update_recommendation_table(trend_clicks, hw_clicks, sarima_clicks):
     # Store click counts for all buttons
     clicks = {
@@ -0,0 +1,315 @@
+import os
+import json
+import atexit
+import time
+import bisect
+import functools
+import threading
+try:
+    import fcntl
+except ImportError:
+    # Windows: no file locking for collecting the snapshots, the metrics are off
+    fcntl = None
+
+# Request-level metrics of the dashboard, exported in Prometheus text format on /metrics of its Flask server.
+#
+# Callbacks run in several processes: the server workers and the processes of the background callbacks
+# (forecast views). Every process keeps its metrics in memory and writes a snapshot to METRICS_DIR at most
+# every FLUSH_INTERVAL seconds after a callback or request, at the end of a background job and at exit;
+# /metrics adds up the snapshots of all processes. Snapshots of processes that
+# have ended are folded into one file, so counters and histograms keep their totals. Gauges are reported
+# per running process (pid label). Delete METRICS_DIR to reset everything.
+# DASHBOARD_METRICS=0 turns the metrics off. Without fcntl (Windows) they are off as well.
+METRICS_REQUESTED = os.environ.get("DASHBOARD_METRICS", "1") != "0"
+METRICS_ENABLED = METRICS_REQUESTED and fcntl is not None
+METRICS_DIR = os.environ.get("DASHBOARD_METRICS_DIR", "cache/metrics")
+FLUSH_INTERVAL = float(os.environ.get("DASHBOARD_METRICS_FLUSH_SECONDS", "5"))
+FINISHED_FILE = "finished.json"
+
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+# 1 KB to 64 MB
+BYTES_BUCKETS = [1024 * 4 ** i for i in range(9)]
+
+# name -> (type, help, histogram buckets)
+METRICS = {
+    "dashboard_callback_duration_seconds": (
+        "histogram", "Run time of the dashboard callback functions by selected view.", LATENCY_BUCKETS),
+    "dashboard_request_duration_seconds": (
+        "histogram", "Duration of the callback requests, including serializing the figures.", LATENCY_BUCKETS),
+    "dashboard_response_bytes": (
+        "histogram", "Size of the callback responses (figure payloads).", BYTES_BUCKETS),
+    "dashboard_forecast_computations_total": (
+        "counter", "Forecasts computed on demand (forecast cache misses) by model. A computation can fit "
+                   "several models, e.g. sarima fits two SARIMAX models.", None),
+    "dashboard_forecast_compute_seconds": (
+        "histogram", "Time to compute a forecast on demand, including all models it fits.", LATENCY_BUCKETS),
+    "dashboard_forecast_cache_requests_total": (
+        "counter", "Forecast cache lookups by model and result (hit or miss).", None),
+    "dashboard_forecast_store_requests_total": (
+        "counter", "Lookups in the precomputed forecast store by result (hit or miss).", None),
+    "dashboard_data_load_seconds": (
+        "gauge", "Time to load and index the dashboard data at startup.", None),
+    "dashboard_data_rows": (
+        "gauge", "Rows of the dashboard data.", None),
+}
+
+# Metrics of this process: name -> {label key: value}. Counters and gauges hold a number, histograms
+# {"buckets": counts per bucket (not cumulative, last one above the largest bound), "sum", "count"}.
+series = {}
+lock = threading.Lock()
+process_start = time.time_ns()
+# time.monotonic() of the last snapshot, pending: timer writing the metrics recorded since then
+last_flush = float("-inf")
+pending = None
+
+
+# A forked process (gunicorn worker, background callback) starts with empty counters and histograms,
+# the parent reports its own. Gauges like the data load time are inherited.
+def reset_after_fork():
+    global lock, process_start, last_flush, pending
+    lock = threading.Lock()
+    process_start = time.time_ns()
+    last_flush = float("-inf")
+    # Threads don't survive a fork
+    pending = None
+    for name in list(series):
+        if METRICS[name][0] != "gauge":
+            del series[name]
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_after_fork)
+
+
+def label_key(labels):
+    return json.dumps(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    if not METRICS_ENABLED:
+        return
+    key = label_key(labels)
+    with lock:
+        values = series.setdefault(name, {})
+        values[key] = values.get(key, 0) + amount
+
+
+def set_gauge(name, value, **labels):
+    if not METRICS_ENABLED:
+        return
+    with lock:
+        series.setdefault(name, {})[label_key(labels)] = value
+
+
+def observe(name, value, **labels):
+    if not METRICS_ENABLED:
+        return
+    buckets = METRICS[name][2]
+    key = label_key(labels)
+    with lock:
+        values = series.setdefault(name, {})
+        if key not in values:
+            values[key] = {"buckets": [0] * (len(buckets) + 1), "sum": 0.0, "count": 0}
+        histogram = values[key]
+        histogram["buckets"][bisect.bisect_left(buckets, value)] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+
+def process_file():
+    return os.path.join(METRICS_DIR, f"{os.getpid()}-{process_start}.json")
+
+
+def write_json(path, content):
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(content, f)
+    os.replace(tmp_path, path)
+
+
+# Write the snapshot of this process, at most every FLUSH_INTERVAL seconds: a flush within the interval
+# schedules one for its end instead. force: write now (end of a background job, exit, /metrics).
+# Background jobs end without running exit handlers and have to flush themselves.
+def flush(force=False):
+    global last_flush, pending
+    if not METRICS_ENABLED:
+        return
+    with lock:
+        wait = last_flush + FLUSH_INTERVAL - time.monotonic()
+        if not force and wait > 0:
+            if pending is None:
+                pending = threading.Timer(wait, flush, kwargs={"force": True})
+                pending.daemon = True
+                pending.start()
+            return
+        if pending is not None:
+            pending.cancel()
+            pending = None
+        last_flush = time.monotonic()
+        snapshot = json.loads(json.dumps({"pid": os.getpid(), "series": series}))
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    write_json(process_file(), snapshot)
+
+
+if METRICS_ENABLED:
+    atexit.register(flush, force=True)
+
+
+# Add counters and histograms of `added` to `total` (gauges are left out)
+def merge(total, added):
+    for name, values in added.items():
+        if name not in METRICS or METRICS[name][0] == "gauge":
+            continue
+        merged = total.setdefault(name, {})
+        for key, value in values.items():
+            if METRICS[name][0] == "counter":
+                merged[key] = merged.get(key, 0) + value
+            elif key not in merged:
+                merged[key] = {"buckets": list(value["buckets"]), "sum": value["sum"], "count": value["count"]}
+            else:
+                histogram = merged[key]
+                histogram["buckets"] = [a + b for a, b in zip(histogram["buckets"], value["buckets"])]
+                histogram["sum"] += value["sum"]
+                histogram["count"] += value["count"]
+    return total
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# Metrics of all processes: counters and histograms summed up, gauges of the running processes with a pid label
+def collect():
+    flush(force=True)
+    total = {}
+    with open(os.path.join(METRICS_DIR, ".lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        finished_path = os.path.join(METRICS_DIR, FINISHED_FILE)
+        finished = read_json(finished_path) or {}
+        finished_changed = False
+
+        for name in sorted(os.listdir(METRICS_DIR)):
+            path = os.path.join(METRICS_DIR, name)
+            if not name.endswith(".json") or name == FINISHED_FILE:
+                continue
+            snapshot = read_json(path)
+            if snapshot is None:
+                continue
+
+            if not process_alive(snapshot["pid"]):
+                merge(finished, snapshot["series"])
+                finished_changed = True
+                os.remove(path)
+                continue
+
+            merge(total, snapshot["series"])
+            for metric, values in snapshot["series"].items():
+                if metric in METRICS and METRICS[metric][0] == "gauge":
+                    for key, value in values.items():
+                        labels = dict(json.loads(key), pid=snapshot["pid"])
+                        total.setdefault(metric, {})[label_key(labels)] = value
+
+        if finished_changed:
+            write_json(finished_path, finished)
+    return merge(total, finished)
+
+
+def escape(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def format_labels(key, extra=()):
+    labels = json.loads(key) + list(extra)
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels) + "}"
+
+
+# Prometheus text exposition format (version 0.0.4)
+def render(total):
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for key, value in sorted(total.get(name, {}).items()):
+            if kind != "histogram":
+                lines.append(f"{name}{format_labels(key)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip([f"{bound:g}" for bound in buckets] + ["+Inf"], value["buckets"]):
+                cumulative += count
+                lines.append(f"{name}_bucket{format_labels(key, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(key)} {value['sum']}")
+            lines.append(f"{name}_count{format_labels(key)} {value['count']}")
+    return "\n".join(lines) + "\n"
+
+
+# Decorator that records the run time of a callback function. labels: optional function of the callback
+# arguments returning extra labels, e.g. which kind of view was selected.
+def timed_callback(labels=None):
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                extra = labels(*args, **kwargs) if labels is not None else {}
+                observe("dashboard_callback_duration_seconds", time.perf_counter() - start,
+                        callback=function.__name__, **extra)
+                flush()
+        return wrapper
+    return decorate
+
+
+# Name of the callback function a Dash update request is for
+def request_callback(app, request):
+    body = request.get_json(silent=True) or {}
+    entry = app.callback_map.get(body.get("output"), {})
+    function = entry.get("callback")
+    if function is None:
+        return "unknown"
+    return getattr(function, "__wrapped__", function).__name__
+
+
+# Time the callback requests of a Dash app, measure their responses and serve /metrics
+def install(app):
+    if not METRICS_ENABLED:
+        if METRICS_REQUESTED:
+            print("Dashboard metrics are off: collecting them needs file locking (fcntl), not available here.")
+        return
+    from flask import Response, g, request
+
+    server = app.server
+
+    @server.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+
+    @server.after_request
+    def record_request(response):
+        if request.path.endswith("_dash-update-component") and "metrics_start" in g:
+            callback = request_callback(app, request)
+            observe("dashboard_request_duration_seconds", time.perf_counter() - g.metrics_start, callback=callback)
+            if not response.direct_passthrough:
+                observe("dashboard_response_bytes", len(response.get_data()), callback=callback)
+            flush()
+        return response
+
+    @server.route("/metrics")
+    def metrics():
+        return Response(render(collect()), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,106 @@
+import os
+import hashlib
+import shutil
+import pandas as pd
+
+# Grouped monthly data of all valid connections, written by preprocess.py
+GROUPED_CSV = "Data/Grouped_All_Valid_Connections.csv"
+# Same data as typed, compressed Parquet dataset with one partition per YEAR
+GROUPED_DATASET = "Data/Grouped_All_Valid_Connections.parquet"
+
+# Columns that are strings even if they look like numbers (e.g. UNIQUE_CARRIER_ENTITY "10874")
+STRING_COLUMNS = ["con_key", "UNIQUE_CARRIER_ENTITY", "UNIQUE_CARRIER", "CARRIER", "REGION", "CLASS"]
+
+# Compact in-memory dtypes (see compact_grouped). Float columns are not downcast: PASSENGERS and SEATS
+# have to stay exact in totals over many rows, and float32 coordinates would end up in the map figures
+# with rounding noise (and more digits).
+COMPACT_DTYPES = {
+    "YEAR": "int16",
+    "MONTH": "int8",
+    "QUARTER": "int8",
+}
+
+
+# Write the grouped data as Parquet dataset partitioned by YEAR, replacing an existing dataset
+def write_grouped(df, path=GROUPED_DATASET):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+
+    write_grouped_years(df, path)
+
+
+# Write the grouped data of the years in df into the Parquet dataset. Only the partitions of these
+# years are replaced, all other years stay as they are.
+def write_grouped_years(df, path=GROUPED_DATASET):
+    df = df.copy()
+    for col in STRING_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(str)
+
+    df.to_parquet(path, partition_cols=["YEAR"], compression="zstd", index=False,
+                  existing_data_behavior="delete_matching")
+
+
+# Convert the grouped data to a compact in-memory form: strings (repeated on every monthly row) become
+# categoricals, numbers get the types in COMPACT_DTYPES and other integer columns the smallest integer type.
+# Note that groupby on categorical columns needs observed=True and strings have to be concatenated
+# after .astype(str).
+def compact_grouped(df):
+    for col in df.columns:
+        if col in COMPACT_DTYPES:
+            df[col] = df[col].astype(COMPACT_DTYPES[col])
+        elif pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col]):
+            df[col] = df[col].astype("category")
+        elif pd.api.types.is_integer_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+    return df
+
+
+# Load the grouped data, only with the given columns (all columns if None) and optionally only some years.
+# Uses the Parquet dataset if it exists and falls back to parsing the csv file otherwise.
+# compact: convert the data with compact_grouped (e.g. for the dashboards, where every worker holds a copy)
+def load_grouped(columns=None, years=None, path=GROUPED_DATASET, csv_path=GROUPED_CSV, compact=False):
+    if os.path.isdir(path):
+        filters = [("YEAR", "in", list(years))] if years is not None else None
+        df = pd.read_parquet(path, columns=columns, filters=filters)
+
+        # The partition column comes back as categorical
+        if "YEAR" in df.columns:
+            df["YEAR"] = df["YEAR"].astype("int64")
+    else:
+        dtypes = {col: str for col in STRING_COLUMNS}
+        df = pd.read_csv(csv_path, usecols=columns, dtype=dtypes, low_memory=False)
+        if years is not None:
+            df = df[df["YEAR"].isin(list(years))].reset_index(drop=True)
+
+    if compact:
+        df = compact_grouped(df)
+    return df
+
+
+# Monthly passengers per route (ROUTE, DATE, PASSENGERS), the series all route insights are computed on.
+# The grouped data has one row per connection (airline, aircraft type) and month, so the connections of
+# a route are summed up. A month with a missing value on any connection stays missing.
+def route_month_series(df):
+    keys = [df["ROUTE"], df["DATE"]]
+    monthly = df["PASSENGERS"].groupby(keys, observed=True).sum()
+    missing = df["PASSENGERS"].isna().groupby(keys, observed=True).any()
+    return monthly.mask(missing).reset_index()
+
+
+# Fingerprint of the files behind the grouped data. It changes whenever preprocess rewrites them,
+# so it can be used to invalidate anything computed from the data.
+def dataset_fingerprint(paths=(GROUPED_DATASET, GROUPED_CSV)):
+    stats = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    file_path = os.path.join(root, name)
+                    stat = os.stat(file_path)
+                    stats.append((file_path, stat.st_size, stat.st_mtime_ns))
+        elif os.path.exists(path):
+            stat = os.stat(path)
+            stats.append((path, stat.st_size, stat.st_mtime_ns))
+
+    return hashlib.sha1(repr(sorted(stats)).encode()).hexdigest()[:16]
@@ -0,0 +1,78 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+import dashboard_metrics
+
+# Maximum number of fitted forecasts kept in memory per process
+MAX_ENTRIES = 256
+
+# Size limit of the forecasts shared on disk (bytes)
+DISK_SIZE_LIMIT = 512 * 2 ** 20
+
+# Marks a key that is not in the disk cache (None could be a cached value)
+MISSING = object()
+
+
+# Bounded LRU cache for forecast results of the dashboard.
+# Entries are keyed by (route, airline, model, target year, data version). version identifies the data
+# the forecasts are computed from: the fingerprint of the data files (datastore.dataset_fingerprint)
+# taken when the dashboard loaded its data, which it keeps in memory until it restarts.
+# Cached values are shared between callbacks and must be treated as read-only.
+# disk: optional second level shared between processes (a diskcache.Cache, see disk_cache). Background
+# callbacks run every job in a new process, only results on disk outlive the job.
+class ForecastCache:
+    def __init__(self, version, max_entries=MAX_ENTRIES, disk=None):
+        self.version = version
+        self.max_entries = max_entries
+        self.disk = disk
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # Return the cached result (from memory, then disk) or call compute() and cache its result.
+    # Exceptions raised by compute() are not cached.
+    def get_or_compute(self, route, airline, model, target_year, compute):
+        key = (route, airline or "all", model, target_year, self.version)
+
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                dashboard_metrics.inc("dashboard_forecast_cache_requests_total", model=model, result="hit")
+                return self.entries[key]
+
+        value = self.disk.get(key, MISSING) if self.disk is not None else MISSING
+        if value is not MISSING:
+            self.hits += 1
+            dashboard_metrics.inc("dashboard_forecast_cache_requests_total", model=model, result="hit")
+        else:
+            self.misses += 1
+            dashboard_metrics.inc("dashboard_forecast_cache_requests_total", model=model, result="miss")
+            start = time.perf_counter()
+            value = compute()
+            dashboard_metrics.inc("dashboard_forecast_computations_total", model=model)
+            dashboard_metrics.observe("dashboard_forecast_compute_seconds", time.perf_counter() - start, model=model)
+            if self.disk is not None:
+                self.disk.set(key, value)
+
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+
+# Disk level of the forecast cache in directory path, shared by all processes on the host.
+# Least recently used forecasts are evicted above size_limit.
+def disk_cache(path, size_limit=DISK_SIZE_LIMIT):
+    import diskcache
+    return diskcache.Cache(path, size_limit=size_limit, eviction_policy="least-recently-used")
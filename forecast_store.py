@@ -0,0 +1,185 @@
+import os
+import json
+import argparse
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from datastore import load_grouped, dataset_fingerprint
+from forecasting import (ROUTE_INDEX_ORDER, build_route_index, prepare_forecast_data, get_forecast_for_year,
+                         sarima_forecast, sarima_forecast_load_factor)
+from preprocess import load_factor
+
+# Precomputed forecasts of all routes and route x airline combinations, written by this script
+FORECAST_STORE = "Data/forecast_store.parquet"
+ROUTES_FILE = "Data/valid_routes.json"
+
+# Years the dashboard offers forecasts for
+FORECAST_YEARS = [2024, 2025]
+
+# Long format: one row per forecasted month of a (route, airline, model, target year).
+# PASSENGERS / LOAD_FACTOR are empty for models that don't forecast them.
+STORE_COLUMNS = ["ROUTE", "AIRLINE", "MODEL", "TARGET_YEAR", "DATE", "PASSENGERS", "LOAD_FACTOR"]
+STORE_KEYS = ["ROUTE", "AIRLINE", "MODEL", "TARGET_YEAR"]
+
+# Schema metadata entry with the fingerprint of the data the forecasts were computed from
+FINGERPRINT_KEY = b"dataset_fingerprint"
+
+
+# Airline key as used by the dashboard ("all" for the sum over all airlines)
+def airline_key(airline):
+    return airline if airline and airline.lower() != "all" else "all"
+
+
+# Forecast input of a route ("ORIGIN-DEST") and airline, exactly as the dashboard prepares it
+def forecast_series(route_index, route, airline):
+    origin, dest = route.split("-")
+    df = prepare_forecast_data(route_index["data"], f"{origin} → {dest}", airline, route_index=route_index)
+    df = df.copy()
+    df["LOAD_FACTOR"] = load_factor(df["PASSENGERS"], df["SEATS"])
+    return df
+
+
+# All (route, airline) combinations of the dashboard: every valid route with "all" and each of its airlines
+def forecast_jobs(route_index, routes_path=ROUTES_FILE):
+    with open(routes_path) as f:
+        routes = [option["value"] for option in json.load(f)]
+
+    jobs = []
+    for route in routes:
+        origin, dest = route.split("-")
+        if (origin, dest) not in route_index["routes"]:
+            continue
+        jobs.append((route, "all"))
+        jobs.extend((route, airline) for airline in route_index["airline_names"].get((origin, dest), []))
+    return jobs
+
+
+# Run all dashboard forecasts of one series. Models that fail are left out, the dashboard
+# computes them on demand then (and shows the same error as without the store).
+def route_forecasts(route, airline, df):
+    warnings.simplefilter("ignore")
+    parts = []
+
+    def add(model, year, dates, passengers=None, load_factors=None):
+        parts.append(pd.DataFrame({
+            "ROUTE": route,
+            "AIRLINE": airline,
+            "MODEL": model,
+            "TARGET_YEAR": year,
+            "DATE": pd.to_datetime(pd.Series(dates).values),
+            "PASSENGERS": passengers.values if passengers is not None else float("nan"),
+            "LOAD_FACTOR": load_factors.values if load_factors is not None else float("nan"),
+        }))
+
+    for year in FORECAST_YEARS:
+        try:
+            holt = get_forecast_for_year(df, year)
+            add("holt_winters", year, holt["DATE"], holt["FORECAST_PASSENGERS"], holt["FORECAST_LOAD_FACTOR"])
+        except Exception:
+            pass
+
+        try:
+            sarima_lf = sarima_forecast_load_factor(df, year)
+            add("sarima_load_factor", year, sarima_lf["DATE"], load_factors=sarima_lf["FORECAST_LOAD_FACTOR"])
+        except Exception:
+            pass
+
+    # One SARIMA run forecasts both years
+    _, _, sarima_2024, sarima_2025, _ = sarima_forecast(df)
+    for year, forecast in zip(FORECAST_YEARS, [sarima_2024, sarima_2025]):
+        forecast = forecast[forecast["TYPE"] == f"Forecast {year}"]
+        if not forecast.empty:
+            add("sarima", year, forecast["DATE"], passengers=forecast["VALUE"].astype("float64"))
+
+    if not parts:
+        return None
+    return pd.concat(parts, ignore_index=True)
+
+
+# Compute the forecasts of all jobs (in parallel with n_jobs > 1, -1 = all cores) and write the store
+def build_forecast_store(route_index, n_jobs=-1, path=FORECAST_STORE, routes_path=ROUTES_FILE):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    fingerprint = dataset_fingerprint()
+    jobs = forecast_jobs(route_index, routes_path)
+    routes = [route for route, _ in jobs]
+    airlines = [airline for _, airline in jobs]
+    series = [forecast_series(route_index, route, airline) for route, airline in jobs]
+
+    if n_jobs is not None and n_jobs < 0:
+        n_jobs = os.cpu_count()
+
+    if not n_jobs or n_jobs == 1:
+        results = list(map(route_forecasts, routes, airlines, series))
+    else:
+        chunksize = max(1, len(jobs) // (n_jobs * 4))
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(route_forecasts, routes, airlines, series, chunksize=chunksize))
+
+    results = [result for result in results if result is not None]
+    store = pd.concat(results, ignore_index=True) if results else pd.DataFrame(columns=STORE_COLUMNS)
+
+    # Compact columns: the keys repeat for every month
+    store = store.astype({"ROUTE": "category", "AIRLINE": "category", "MODEL": "category", "TARGET_YEAR": "int16"})
+
+    table = pa.Table.from_pandas(store[STORE_COLUMNS], preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), FINGERPRINT_KEY: fingerprint.encode()})
+    pq.write_table(table, path, compression="zstd")
+
+    print(f"{len(jobs)} series, {len(store)} forecast rows written to {path}")
+    return store
+
+
+# Read-only lookup of precomputed forecasts. get() returns the frames in the same shape as the
+# forecasting functions used by the dashboard, or None if the forecast is not in the store.
+class ForecastStore:
+    def __init__(self, store):
+        self.store = store.reset_index(drop=True)
+        self.positions = self.store.groupby(STORE_KEYS, sort=False, observed=True).indices
+
+    def get(self, route, airline, model, target_year):
+        positions = self.positions.get((route, airline_key(airline), model, target_year))
+        if positions is None:
+            return None
+
+        rows = self.store.iloc[positions]
+        dates = rows["DATE"].reset_index(drop=True)
+        if model == "holt_winters":
+            return pd.DataFrame({
+                "DATE": dates,
+                "FORECAST_PASSENGERS": rows["PASSENGERS"].values,
+                "FORECAST_LOAD_FACTOR": rows["LOAD_FACTOR"].values
+            })
+        if model == "sarima":
+            return pd.DataFrame({"DATE": dates, "VALUE": rows["PASSENGERS"].values, "TYPE": f"Forecast {target_year}"})
+        return pd.DataFrame({"DATE": dates, "FORECAST_LOAD_FACTOR": rows["LOAD_FACTOR"].values})
+
+
+# Load the store, None if it doesn't exist or was computed from other data than the current one
+def load_forecast_store(path=FORECAST_STORE):
+    if not os.path.exists(path):
+        return None
+
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    fingerprint = (table.schema.metadata or {}).get(FINGERPRINT_KEY, b"").decode()
+    if fingerprint != dataset_fingerprint():
+        print(f"Ignoring {path}: computed from other data, run forecast_store.py again")
+        return None
+
+    return ForecastStore(table.to_pandas())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute the dashboard forecasts of all routes and airlines.")
+    parser.add_argument("--jobs", type=int, default=-1, help="number of worker processes (-1 = all cores)")
+    args = parser.parse_args()
+
+    # Same data and row order as in the dashboard
+    data = load_grouped(["YEAR", "MONTH", "ORIGIN", "DEST", "UNIQUE_CARRIER_NAME", "PASSENGERS", "SEATS"])
+    data["DATE"] = pd.to_datetime(data["YEAR"].astype(str) + "-" + data["MONTH"].astype(str) + "-01")
+    data = data.sort_values(ROUTE_INDEX_ORDER, kind="stable", ignore_index=True)
+
+    build_forecast_store(build_route_index(data), n_jobs=args.jobs)
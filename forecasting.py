@@ -1,11 +1,10 @@
 import pandas as pd
-from statsmodels.tsa.holtwinters import ExponentialSmoothing
-import pandas as pd
 import numpy as np
-from statsmodels.tsa.statespace.sarimax import SARIMAX
-from sklearn.metrics import mean_absolute_error, mean_squared_error
 import warnings 
 
+# statsmodels and sklearn are imported inside the forecast functions,
+# so that importing this module (e.g. by the dashboard) stays fast
+
 warnings.filterwarnings("ignore")
 
 def load_historical_data(file_path):
@@ -21,9 +20,79 @@ def load_historical_data(file_path):
 
 
 
-def prepare_forecast_data(data, selected_route, selected_airline):
+# Sort order of the data expected by build_route_index: rows of a route, and of an airline
+# on that route, are then contiguous
+ROUTE_INDEX_ORDER = ["ORIGIN", "DEST", "UNIQUE_CARRIER_NAME"]
+
+# Build lookup tables for the dashboard once at startup. data has to be (stable) sorted by ROUTE_INDEX_ORDER
+# with a default RangeIndex, so every route and route+airline is a contiguous slice of it.
+# The key columns may be categoricals (see datastore.compact_grouped), only observed combinations are indexed.
+# Returns a dict with
+#   "data":     the sorted data itself
+#   "routes":   (origin, dest) -> slice of all rows of the route
+#   "airlines": (origin, dest, airline) -> slice of the rows of the airline on the route
+#   "airline_names": (origin, dest) -> sorted airline names on the route
+#   "monthly":  (origin, dest) -> monthly totals of all airlines (as returned by prepare_forecast_data)
+def build_route_index(data):
+    def slices(keys):
+        return {key: slice(pos[0], pos[-1] + 1) for key, pos in data.groupby(keys, sort=False, observed=True).indices.items()}
+
+    route_index = {
+        "data": data,
+        "routes": slices(["ORIGIN", "DEST"]),
+        "airlines": slices(["ORIGIN", "DEST", "UNIQUE_CARRIER_NAME"]),
+    }
+
+    route_index["airline_names"] = {
+        (origin, dest): sorted(airlines)
+        for (origin, dest), airlines in data.groupby(["ORIGIN", "DEST"], sort=False, observed=True)["UNIQUE_CARRIER_NAME"]
+        .agg(lambda names: list(names.dropna().unique())).items()
+    }
+
+    # Monthly totals of all airlines per route, aggregated once for all routes
+    monthly = data.groupby(["ORIGIN", "DEST", "DATE"], as_index=False, observed=True)[["PASSENGERS", "SEATS"]].sum()
+    monthly["LOAD_FACTOR"] = monthly["PASSENGERS"] / monthly["SEATS"]
+    monthly["YEAR"] = monthly["DATE"].dt.year
+    monthly["MONTH"] = monthly["DATE"].dt.month
+    route_index["monthly"] = {
+        key: monthly.iloc[pos[0]:pos[-1] + 1][["DATE", "PASSENGERS", "SEATS", "LOAD_FACTOR", "YEAR", "MONTH"]].reset_index(drop=True)
+        for key, pos in monthly.groupby(["ORIGIN", "DEST"], sort=False, observed=True).indices.items()
+    }
+
+    return route_index
+
+# Rows of a route (optionally only of one airline, None or "all" for all airlines) from the route index
+def lookup_route_rows(route_index, origin, dest, airline=None):
+    data = route_index["data"]
+    if not airline or airline.lower() == "all":
+        rows = route_index["routes"].get((origin, dest))
+    else:
+        rows = route_index["airlines"].get((origin, dest, airline))
+
+    if rows is None:
+        return data.iloc[0:0]
+    return data.iloc[rows]
+
+
+# Data of a route ("ORIGIN → DEST") for forecasting: monthly totals of all airlines or the rows of a single airline.
+# If a route index (see build_route_index) is given, the data is looked up there instead of filtering the whole frame.
+def prepare_forecast_data(data, selected_route, selected_airline, route_index=None):
+    if route_index is not None:
+        origin, dest = selected_route.split(" → ")
+
+        if not selected_airline or selected_airline.lower() == "all":
+            monthly = route_index["monthly"].get((origin, dest))
+            if monthly is None:
+                return pd.DataFrame(columns=["DATE", "PASSENGERS", "SEATS", "LOAD_FACTOR", "YEAR", "MONTH"])
+            return monthly.copy()
+
+        df = lookup_route_rows(route_index, origin, dest, selected_airline)
+        if df.empty:
+            raise ValueError(f"No data for airline '{selected_airline}' on this route.")
+        return df.assign(LOAD_FACTOR=df["PASSENGERS"] / df["SEATS"])
+
     df = data.copy()
-    df["ROUTE"] = df["ORIGIN"] + " → " + df["DEST"]
+    df["ROUTE"] = df["ORIGIN"].astype(str) + " → " + df["DEST"].astype(str)
     df = df[df["ROUTE"] == selected_route]
 
     # If no airline selected, or "all"
@@ -51,6 +120,8 @@ def prepare_forecast_data(data, selected_route, selected_airline):
 
 
 def forecast_load_factor(df, periods=12):
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
     df = df.sort_values("DATE")
     df = df.set_index("DATE")
     df.index.freq = 'MS'
@@ -71,6 +142,8 @@ def forecast_load_factor(df, periods=12):
 
 
 def forecast_passengers(df, periods=12):
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
     # using Holt-Winters exponential smoothing.
     df = df.sort_values("DATE")
     df = df.set_index("DATE")
@@ -112,7 +185,13 @@ def get_forecast_for_year(df, target_year, periods=12):
 
 
 
+# The models are fitted without parameter covariance (cov_type='none'), only the point forecasts are used.
+# The refit on the full training data starts cold. Starting it from the parameters of the first fit, or
+# appending the new months to the first fit (with or without refit), is not faster or moves the forecasts
+# away from the full fit, see benchmarks/sarima_warm_start.py.
 def sarima_forecast(df, start_train='2022-01-01', valid_start='2024-01-01', pred_start='2025-01-01', periods=12):
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
    
     # Sort and reset index for consistency
     df = df.sort_values('DATE').reset_index(drop=True)
@@ -125,7 +204,7 @@ def sarima_forecast(df, start_train='2022-01-01', valid_start='2024-01-01', pred
     try:
         # Fit SARIMA model on initial training data
         model_initial = SARIMAX(train_initial['PASSENGERS'], order=(1, 1, 1), seasonal_order=(1, 1, 1, 12))
-        model_fit_initial = model_initial.fit(disp=False)
+        model_fit_initial = model_initial.fit(cov_type='none', disp=False)
 
         # Forecast validation period (2024)
         forecast_valid = model_fit_initial.get_forecast(steps=len(valid_2024))
@@ -142,7 +221,7 @@ def sarima_forecast(df, start_train='2022-01-01', valid_start='2024-01-01', pred
 
         # Retrain SARIMA model on full training data including validation period
         model_final = SARIMAX(full_train['PASSENGERS'], order=(1, 1, 1), seasonal_order=(1, 1, 1, 12))
-        model_fit_final = model_final.fit(disp=False)
+        model_fit_final = model_final.fit(cov_type='none', disp=False)
 
         # Forecast future period (2025)
         forecast_2025 = model_fit_final.get_forecast(steps=periods)
@@ -170,6 +249,8 @@ def sarima_forecast(df, start_train='2022-01-01', valid_start='2024-01-01', pred
 
 
 def sarima_forecast_load_factor(df, forecast_year, periods=12):
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+
     df = df.copy()
     df = df.sort_values('DATE')
     df.index = pd.to_datetime(df['DATE'])
@@ -179,7 +260,7 @@ def sarima_forecast_load_factor(df, forecast_year, periods=12):
     ts = df[df.index.year < forecast_year]['LOAD_FACTOR']
 
     model = SARIMAX(ts, order=(1, 1, 1), seasonal_order=(1, 1, 1, 12))
-    fit = model.fit(disp=False)
+    fit = model.fit(cov_type='none', disp=False)
 
     forecast_index = pd.date_range(start=f"{forecast_year}-01-01", periods=periods, freq='MS')
     forecast_values = fit.get_forecast(steps=periods).predicted_mean
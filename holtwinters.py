@@ -0,0 +1,217 @@
+import numpy as np
+
+# Additive Holt-Winters (additive trend, additive seasonality) for many equal-length monthly series at once.
+# The series are the rows of a (series x months) array, the recursions run over the months for all series
+# (and all candidate smoothing parameters) in one pass. Same recursions as statsmodels
+# ExponentialSmoothing(trend='add', seasonal='add'), with its default estimated initial states or its
+# initialization_method='legacy-heuristic'.
+#
+# The one-step errors are linear in the initial states, so for every candidate set of smoothing parameters
+# the best initial states (least squares) follow from a small linear system. The search over the smoothing
+# parameters then finds the fit statsmodels estimates with its optimizer, or one with a lower error.
+
+SEASONAL_PERIODS = 12
+
+# Smoothing parameters are searched on a grid over [0, 1]^3 first, then refined around the best
+# point of every series on finer and finer local grids. As in statsmodels the trend smoothing is
+# limited to beta <= alpha and the seasonal smoothing to gamma <= 1 - alpha.
+GRID_POINTS = 11
+REFINE_ROUNDS = 6
+REFINE_POINTS = 5
+
+# Series fitted together, bounds the memory of the candidate arrays
+BLOCK_SIZE = 64
+
+
+# Initial level, trend and seasonal states per series, as statsmodels "legacy-heuristic" computes them.
+# Needs at least two seasonal cycles. Returns arrays of shape (n,), (n,), (n, seasonal_periods).
+def initial_states(y, seasonal_periods=SEASONAL_PERIODS):
+    y = np.asarray(y, dtype="float64")
+    m = seasonal_periods
+    if y.shape[1] < 2 * m:
+        raise ValueError(f"Holt-Winters needs at least {2 * m} observations per series, got {y.shape[1]}")
+
+    level = y[:, np.arange(y.shape[1]) % m == 0].mean(axis=1)
+    trend = ((y[:, m:2 * m] - y[:, :m]) / m).mean(axis=1)
+    seasonal = y[:, :m] - level[:, None]
+    return level, trend, seasonal
+
+
+# Run the recursions over all months. alpha, beta and gamma are arrays of shape (n, k) with k candidate
+# parameter sets per series (or (n,) for one set), the initial states are those of initial_states().
+# Returns the sum of squared one-step errors and the final states, all with the shape of the parameters:
+# level, trend, seasonal (last m seasonal states, by month % m) and the seasonal state of the last month
+# before its final update.
+def holt_winters_filter(y, alpha, beta, gamma, level, trend, seasonal):
+    y = np.asarray(y, dtype="float64")
+    alpha, beta, gamma = (np.asarray(p, dtype="float64") for p in (alpha, beta, gamma))
+    shape = np.broadcast_shapes(alpha.shape, beta.shape, gamma.shape)
+    extra_dims = (1,) * (len(shape) - 1)
+    m = seasonal.shape[-1]
+
+    level = np.broadcast_to(level.reshape(level.shape[0], *extra_dims), shape).copy()
+    trend = np.broadcast_to(trend.reshape(trend.shape[0], *extra_dims), shape).copy()
+    seasonal = np.broadcast_to(seasonal.reshape(seasonal.shape[0], *extra_dims, m), shape + (m,)).copy()
+    sse = np.zeros(shape)
+
+    for t in range(y.shape[1]):
+        y_t = y[:, t].reshape(y.shape[0], *extra_dims)
+        season = seasonal[..., t % m].copy()
+        prediction = level + trend
+
+        sse += (y_t - prediction - season) ** 2
+        new_level = alpha * (y_t - season) + (1 - alpha) * prediction
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        seasonal[..., t % m] = gamma * (y_t - prediction) + (1 - gamma) * season
+        level = new_level
+
+    return sse, level, trend, seasonal, season
+
+
+# One-step predictions of every month. y has shape (months, ...), it broadcasts with the parameters and the
+# initial states (seasonal with a trailing axis of seasonal_periods), so series, candidate parameters and
+# initial states can all be run at once. Returns the predictions, shape (months, ...).
+def predictions(y, alpha, beta, gamma, level, trend, seasonal):
+    m = seasonal.shape[-1]
+    shape = np.broadcast_shapes(y.shape[1:], np.shape(alpha), np.shape(beta), np.shape(gamma),
+                                np.shape(level), np.shape(trend), seasonal.shape[:-1])
+    level = np.broadcast_to(level, shape).copy()
+    trend = np.broadcast_to(trend, shape).copy()
+    seasonal = np.broadcast_to(seasonal, shape + (m,)).copy()
+    result = np.empty((y.shape[0],) + shape)
+
+    for t in range(y.shape[0]):
+        season = seasonal[..., t % m].copy()
+        prediction = level + trend
+        result[t] = prediction + season
+
+        new_level = alpha * (y[t] - season) + (1 - alpha) * prediction
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        seasonal[..., t % m] = gamma * (y[t] - prediction) + (1 - gamma) * season
+        level = new_level
+
+    return result
+
+
+# Best initial states (least squares) of the series y (n, months) for the parameter sets alpha, beta, gamma
+# (shape (n, k), or (1, k) for the same sets for all series). The one-step errors are those with zero
+# initial states minus the response of the predictions to the initial states, which doesn't depend on y.
+# Adding a constant to the level and subtracting it from all seasonal states changes no prediction, so the
+# system is solved with level 0 and the seasonal states are centred afterwards.
+# Returns the sum of squared errors (n, k) and the initial states (n, k, 2 + seasonal_periods):
+# level, trend and the seasonal states.
+def estimate_initial_states(y, alpha, beta, gamma, seasonal_periods=SEASONAL_PERIODS):
+    y = np.asarray(y, dtype="float64")
+    m = seasonal_periods
+    units = np.eye(1 + m)
+
+    # Response of the predictions to the trend and every seasonal state, (..., k, 1 + m, months)
+    parameters = [np.asarray(p, dtype="float64")[..., None] for p in (alpha, beta, gamma)]
+    response = predictions(np.zeros((y.shape[1], 1)), *parameters, np.zeros(1), units[:, 0], units[:, 1:])
+    response = np.moveaxis(response, 0, -1)
+
+    # Errors with zero initial states, (n, k, months, 1)
+    zero = np.zeros(1)
+    errors = y.T[:, :, None] - predictions(y.T[:, :, None], alpha, beta, gamma, zero, zero, np.zeros((1, m)))
+    errors = np.moveaxis(errors, 0, -1)[..., None]
+
+    moments = response @ errors
+    solution = np.linalg.inv(response @ np.swapaxes(response, -1, -2)) @ moments
+    sse = (errors ** 2).sum(axis=(-2, -1)) - (moments * solution).sum(axis=(-2, -1))
+
+    trend, seasonal = solution[..., 0, 0], solution[..., 1:, 0]
+    level = seasonal.mean(axis=-1)
+    states = np.concatenate([level[..., None], trend[..., None], seasonal - level[..., None]], axis=-1)
+    return np.maximum(sse, 0.0), states
+
+
+# Smoothing parameter sets of a local grid around center (n, 3) with the given step, clipped to [0, 1].
+# Returns alpha, beta, gamma of shape (n, points ** 3).
+def local_grid(center, step, points):
+    offsets = np.linspace(-step, step, points)
+    grid = np.stack(np.meshgrid(offsets, offsets, offsets, indexing="ij"), axis=-1).reshape(-1, 3)
+    candidates = np.clip(center[:, None, :] + grid[None, :, :], 0.0, 1.0)
+    return candidates[..., 0], candidates[..., 1], candidates[..., 2]
+
+
+# Fit additive Holt-Winters to every row of y by minimising the sum of squared one-step errors.
+# initialization_method: "estimated" fits the initial states too (statsmodels default), "legacy-heuristic"
+# takes them from the first two seasonal cycles (initial_states). Series with missing values get NaN
+# parameters. Returns a dict of arrays (one entry per series): alpha, beta, gamma, sse and the final states
+# level, trend, seasonal, last_season (plus n_obs) for forecast().
+def fit_holt_winters(y, seasonal_periods=SEASONAL_PERIODS, grid_points=GRID_POINTS,
+                     refine_rounds=REFINE_ROUNDS, refine_points=REFINE_POINTS, initialization_method="estimated"):
+    if initialization_method not in ("estimated", "legacy-heuristic"):
+        raise ValueError(f"Unknown initialization_method {initialization_method!r}")
+
+    y = np.asarray(y, dtype="float64")
+    if y.shape[1] < 2 * seasonal_periods:
+        raise ValueError(f"Holt-Winters needs at least {2 * seasonal_periods} observations per series, got {y.shape[1]}")
+
+    blocks = [fit_block(y[start:start + BLOCK_SIZE], seasonal_periods, grid_points, refine_rounds, refine_points,
+                        initialization_method)
+              for start in range(0, y.shape[0], BLOCK_SIZE)]
+    fit = {key: np.concatenate([block[key] for block in blocks]) for key in blocks[0]}
+    fit["n_obs"] = y.shape[1]
+    return fit
+
+
+# fit_holt_winters for one block of series
+def fit_block(y, seasonal_periods, grid_points, refine_rounds, refine_points, initialization_method):
+    rows = np.arange(y.shape[0])
+    m = seasonal_periods
+
+    if initialization_method == "estimated":
+        def sse_of(alpha, beta, gamma):
+            return estimate_initial_states(y, alpha, beta, gamma, m)[0]
+    else:
+        level0, trend0, seasonal0 = initial_states(y, m)
+
+        def sse_of(alpha, beta, gamma):
+            return holt_winters_filter(y, alpha, beta, gamma, level0, trend0, seasonal0)[0]
+
+    def best(alpha, beta, gamma):
+        alpha, beta, gamma = np.broadcast_arrays(alpha, beta, gamma)
+        sse = np.broadcast_to(sse_of(alpha, beta, gamma), (y.shape[0], alpha.shape[1]))
+        feasible = (beta <= alpha + 1e-12) & (gamma <= 1 - alpha + 1e-12)
+        sse = np.where(np.isnan(sse) | ~feasible, np.inf, sse)
+        pick = sse.argmin(axis=1)
+        select = (rows, pick) if alpha.shape[0] == y.shape[0] else (0, pick)
+        return np.stack([alpha[select], beta[select], gamma[select]], axis=1)
+
+    # Coarse grid, the same for all series
+    grid = np.linspace(0.0, 1.0, grid_points)
+    alpha, beta, gamma = (p.reshape(1, -1) for p in np.meshgrid(grid, grid, grid, indexing="ij"))
+    params = best(alpha, beta, gamma)
+
+    # Local refinement, the center is always a candidate, so the error never gets worse
+    step = 1.0 / (grid_points - 1)
+    for _ in range(refine_rounds):
+        params = best(*local_grid(params, step, refine_points))
+        step /= 2
+
+    alpha, beta, gamma = params[:, 0], params[:, 1], params[:, 2]
+    if initialization_method == "estimated":
+        states = estimate_initial_states(y, alpha[:, None], beta[:, None], gamma[:, None], m)[1][:, 0]
+        level0, trend0, seasonal0 = states[:, 0], states[:, 1], states[:, 2:]
+    sse, level, trend, seasonal, last_season = holt_winters_filter(y, alpha, beta, gamma, level0, trend0, seasonal0)
+
+    missing = np.isnan(y).any(axis=1)
+    for values in (alpha, beta, gamma):
+        values[missing] = np.nan
+
+    return {
+        "alpha": alpha, "beta": beta, "gamma": gamma, "sse": sse,
+        "level": level, "trend": trend, "seasonal": seasonal, "last_season": last_season
+    }
+
+
+# Forecasts of the next h months after the fitted data, array of shape (n, h).
+# Like statsmodels, horizons that are a multiple of the seasonal period use the seasonal state of the
+# last month from before its final update.
+def forecast(fit, h=12):
+    steps = np.arange(1, h + 1)
+    m = fit["seasonal"].shape[-1]
+    season = fit["seasonal"][:, (fit["n_obs"] + steps - 1) % m]
+    season = np.where(steps % m == 0, fit["last_season"][:, None], season)
+    return fit["level"][:, None] + steps[None, :] * fit["trend"][:, None] + season
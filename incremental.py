@@ -0,0 +1,269 @@
+#! /usr/bin/python3
+# Incremental ingestion of new monthly T-100 releases.
+#
+# preprocess.py and Connection_473.py rebuild everything from the yearly raw files. BTS publishes the
+# segment data monthly, so this module only reads the (YEAR, MONTH) partitions that are not ingested
+# yet and adds them to the existing grouped data:
+#   - a manifest records the ingested partitions and the raw files already seen (size/mtime), so
+#     unchanged files are skipped and months already ingested are filtered out while reading. Every
+#     file is read once, all results below come from that one aggregate
+#   - the new rows of the currently valid connections are grouped like preprocess does and replace
+#     only the Parquet partitions of the affected years. The CSV copy of preprocess.py is not kept up
+#     to date (everything reads the Parquet dataset), a warning says it is stale until preprocess.py
+#     writes it again
+#   - a connection stays valid as long as it passed the check (Connection_473) in every complete year.
+#     The monthly passenger/departure stats of the valid connections are kept for the running year,
+#     and when its 12th month arrives only those connections are checked for that year. Months without
+#     stats (ingested by a full preprocess run) are taken from the raw file if it still has them,
+#     otherwise from the grouped data
+# New data can only remove connections (they had to pass all earlier years), so nothing else is reread.
+#
+#   python incremental.py Data/T_T100I_SEGMENT_ALL_CARRIER_2025.csv [more files ...]
+import os
+import sys
+import json
+import pandas as pd
+from profiling import stage
+from ingest import CONNECTION_KEYS, aggregate_segments, filter_connections, load_connections
+from datastore import GROUPED_CSV, GROUPED_DATASET, load_grouped, write_grouped_years
+from Connection_473 import ALL_MONTHS, MIN_PAX_PER_DEPARTURE, connection_month_flows, passing_connections
+from preprocess import (add_coordinates, columns_to_keep, finish_grouped, group_aggregations, make_key,
+                        make_keys, write_route_options)
+
+CONNECTIONS_FILE = "Data/Connections.xlsx"
+# Ingested (YEAR, MONTH) partitions and fingerprints of the raw files already read
+MANIFEST_FILE = "Data/ingest_manifest.json"
+# Monthly passengers/departures of the valid connections in years that are not complete yet
+MONTH_STATS_FILE = "Data/connection_month_stats.parquet"
+
+PARTITION_KEYS = ["YEAR", "MONTH"]
+# Raw rows are aggregated per connection and month
+RAW_KEYS = CONNECTION_KEYS + PARTITION_KEYS
+
+
+# Size and modification time of a raw file, it changes when BTS republishes the file
+def file_fingerprint(path):
+    stat = os.stat(path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+# Load the manifest. Without one, the partitions of the existing grouped data count as ingested.
+def load_manifest(path=MANIFEST_FILE):
+    if os.path.exists(path):
+        with open(path) as f:
+            manifest = json.load(f)
+        manifest["partitions"] = {tuple(p) for p in manifest["partitions"]}
+        return manifest
+
+    existing = load_grouped(columns=PARTITION_KEYS).drop_duplicates()
+    partitions = {(int(year), int(month)) for year, month in existing.itertuples(index=False)}
+    return {"partitions": partitions, "files": {}}
+
+
+def save_manifest(manifest, path=MANIFEST_FILE):
+    with open(path, "w") as f:
+        json.dump({"partitions": sorted(manifest["partitions"]), "files": manifest["files"]}, f)
+
+
+# Row filter (chunk -> boolean mask) that keeps only the given (YEAR, MONTH) partitions
+def partition_rows(partitions):
+    wanted = pd.MultiIndex.from_tuples(sorted(partitions), names=PARTITION_KEYS)
+
+    def rows(chunk):
+        keys = pd.MultiIndex.from_arrays([chunk["YEAR"].astype("int64"), chunk["MONTH"].astype("int64")])
+        return keys.isin(wanted)
+    return rows
+
+
+# Read a raw file once and aggregate the rows of the valid connections per connection, year and month,
+# with the grouped columns of preprocess and the monthly passengers/departures of the eligibility
+# check (NUM_PAX/NUM_DEP, see Connection_473). Rows of the `skip` partitions are left out.
+# Returns the (YEAR, MONTH) partitions of the whole file and the aggregate.
+def read_raw_file(path, connections, skip):
+    partitions = set()
+    skipped = partition_rows(skip) if skip else None
+
+    def prepare(chunk):
+        months = chunk[PARTITION_KEYS].dropna().drop_duplicates()
+        partitions.update((int(year), int(month)) for year, month in months.itertuples(index=False))
+        with stage("filter", rows=len(chunk)):
+            if skipped is not None:
+                chunk = chunk[~skipped(chunk)]
+            chunk = filter_connections(chunk, connections)
+        flows = connection_month_flows(chunk)
+        return chunk.assign(NUM_PAX=flows["NUM_PAX"], NUM_DEP=flows["NUM_DEP"])
+
+    agg = {**group_aggregations(RAW_KEYS), "NUM_PAX": "sum", "NUM_DEP": "sum"}
+    aggregate = aggregate_segments(path, columns_to_keep, RAW_KEYS, agg, prepare=prepare)
+    return partitions, aggregate
+
+
+# Grouped rows (like preprocess) of the given partitions of an aggregate of read_raw_file
+def aggregate_grouped(aggregate, partitions):
+    grouped = aggregate.reset_index()
+    grouped = grouped[partition_rows(partitions)(grouped)]
+    return finish_grouped(grouped.assign(con_key=make_keys(grouped)))
+
+
+# Monthly passengers and departures per connection of an aggregate of read_raw_file
+def aggregate_month_stats(aggregate):
+    stats = aggregate[["NUM_PAX", "NUM_DEP"]]
+    return stats[stats.index.get_level_values("MONTH").isin(ALL_MONTHS)]
+
+
+# (YEAR, MONTH) partitions with month stats
+def stats_partitions(stats):
+    if stats is None:
+        return set()
+    months = stats.index.droplevel(CONNECTION_KEYS).unique()
+    return {(int(year), int(month)) for year, month in months}
+
+
+# Years of which all 12 months are in the partitions
+def complete_years(partitions):
+    return {year for year, _ in partitions if all((year, month) in partitions for month in ALL_MONTHS)}
+
+
+# Month stats of ingested months without any (they came from a full preprocess run and weren't in the
+# raw files of this refresh), from the grouped data. Its sums also count rows without departures,
+# which the check leaves out; such rows hardly carry passengers.
+def grouped_month_stats(partitions):
+    years = sorted({year for year, _ in partitions})
+    grouped = load_grouped(columns=CONNECTION_KEYS + PARTITION_KEYS + ["PASSENGERS", "DEPARTURES_PERFORMED"],
+                           years=years)
+    grouped = grouped[partition_rows(partitions)(grouped)]
+    stats = grouped.rename(columns={"PASSENGERS": "NUM_PAX", "DEPARTURES_PERFORMED": "NUM_DEP"})
+    return stats.groupby(CONNECTION_KEYS + PARTITION_KEYS)[["NUM_PAX", "NUM_DEP"]].sum()
+
+
+def load_month_stats(path=MONTH_STATS_FILE):
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path).set_index(CONNECTION_KEYS + PARTITION_KEYS)
+
+
+def save_month_stats(stats, path=MONTH_STATS_FILE):
+    stats.reset_index().to_parquet(path, index=False)
+
+
+# Check the valid connections against the years completed by the new partitions.
+# Returns the connections that still pass and the stats of the years that are still running.
+def reevaluate_connections(connections, stats, partitions, new_partitions, k=MIN_PAX_PER_DEPARTURE):
+    new_years = {year for year, _ in new_partitions}
+    completed = sorted(year for year in new_years if all((year, month) in partitions for month in ALL_MONTHS))
+
+    passed = connections
+    for year in completed:
+        year_stats = stats.xs(year, level="YEAR")
+        passed = passed.intersection(passing_connections(year_stats, k))
+        stats = stats.drop(year, level="YEAR")
+        print(f"{year} complete: {len(passed)} of {len(connections)} connections still passing.")
+
+    stats = stats[stats.index.droplevel(PARTITION_KEYS).isin(passed)]
+    return passed, stats
+
+
+# Add all (YEAR, MONTH) partitions of the given raw files that are not ingested yet
+def refresh(files, k=MIN_PAX_PER_DEPARTURE):
+    if not os.path.isdir(GROUPED_DATASET) and not os.path.exists(GROUPED_CSV):
+        raise FileNotFoundError(f"No grouped data ({GROUPED_DATASET}) to add to, run preprocess.py first.")
+
+    manifest = load_manifest()
+    connections = load_connections(CONNECTIONS_FILE)
+
+    # Every file is read once. Besides the new months, the rows of ingested months of running years are
+    # aggregated if there are no month stats for them yet (e.g. months of a full preprocess run).
+    stored_stats = load_month_stats()
+    ingested = set(manifest["partitions"])
+    completed_before = complete_years(ingested)
+    have_stats = stats_partitions(stored_stats)
+
+    new_partitions = set()
+    new_grouped = []
+    new_stats = []
+    for path in files:
+        fingerprint = file_fingerprint(path)
+        if manifest["files"].get(path) == fingerprint:
+            print(f"{path}: unchanged, skipped.")
+            continue
+
+        skip = {(year, month) for year, month in ingested
+                if year in completed_before or (year, month) in have_stats}
+        file_partitions, aggregate = read_raw_file(path, connections, skip)
+        partitions = file_partitions - ingested
+        if partitions:
+            print(f"{path}: new months {sorted(partitions)}")
+            new_grouped.append(aggregate_grouped(aggregate, partitions))
+            new_partitions |= partitions
+        else:
+            print(f"{path}: no new months.")
+        stats = aggregate_month_stats(aggregate)
+        new_stats.append(stats)
+        ingested |= partitions
+        have_stats |= stats_partitions(stats)
+        manifest["files"][path] = fingerprint
+
+    if not new_partitions:
+        save_manifest(manifest)
+        return
+
+    # Eligibility, only the currently valid connections are affected. The earlier months of the years
+    # with new months need their stats too, the ones still missing are taken from the grouped data.
+    partitions = manifest["partitions"] | new_partitions
+    new_years = {year for year, _ in new_partitions}
+    missing = {(year, month) for year, month in manifest["partitions"]
+               if year in new_years and (year, month) not in have_stats}
+    if missing:
+        print(f"No raw month stats for {sorted(missing)}, taken from the grouped data.")
+        new_stats.append(grouped_month_stats(missing))
+    stats = pd.concat(([stored_stats] if stored_stats is not None else []) + new_stats)
+    passed, stats = reevaluate_connections(connections, stats, partitions, new_partitions, k)
+    removed = connections.difference(passed)
+
+    # Grouped data: replace the partitions of the new years, and of all years if connections were removed
+    grouped = add_coordinates(pd.concat(new_grouped, ignore_index=True))
+    grouped["YEAR"] = grouped["YEAR"].astype("int64")
+    years = sorted({year for year, _ in new_partitions})
+    if len(removed) or not os.path.isdir(GROUPED_DATASET):
+        years = None
+    current = load_grouped(years=years)
+    # Months of an interrupted earlier refresh are replaced, not duplicated
+    current = current[~partition_rows(new_partitions)(current)]
+
+    # The partition column comes back last, keep the column order of preprocess
+    updated = pd.concat([current[list(grouped.columns)], grouped], ignore_index=True)
+    if len(removed):
+        removed_keys = {make_key(*con) for con in removed}
+        updated = updated[~updated["con_key"].isin(removed_keys)]
+    # Same row order as a full preprocess run
+    updated = updated.sort_values(["YEAR", "con_key", "MONTH"], kind="stable")
+    write_grouped_years(updated)
+    if os.path.exists(GROUPED_CSV):
+        print(f"Warning: {GROUPED_CSV} is not updated incrementally and is now stale, it misses the new "
+              f"months. The dashboards read {GROUPED_DATASET}; run preprocess.py to write the CSV again.")
+
+    # New months of valid connections don't add routes; the routes only change with the connections,
+    # and then all years were loaded
+    if years is None:
+        write_route_options(updated)
+
+    if len(removed):
+        passed.sort_values().to_frame(index=False).to_excel(CONNECTIONS_FILE, index=False)
+    save_month_stats(stats)
+    manifest["partitions"] = partitions
+    save_manifest(manifest)
+
+    rewritten = "all years" if years is None else f"years {years}"
+    print(f"Added {len(grouped)} grouped rows for {len(new_partitions)} new month(s), "
+          f"removed {len(removed)} connection(s). Rewrote {rewritten}: {len(updated)} grouped rows.")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python incremental.py RAW_CSV [RAW_CSV ...]")
+        sys.exit(1)
+    try:
+        refresh(sys.argv[1:])
+    except FileNotFoundError as e:
+        print(e)
+        sys.exit(1)
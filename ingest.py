@@ -0,0 +1,117 @@
+import pandas as pd
+from profiling import stage, timed
+
+# Number of raw rows read from a yearly T_T100I_SEGMENT file at once
+CHUNKSIZE = 200_000
+
+# Columns that identify a connection (without year/month)
+CONNECTION_KEYS = ["AIRLINE_ID", "UNIQUE_CARRIER_ENTITY", "ORIGIN", "DEST", "AIRCRAFT_TYPE"]
+
+# Explicit compact dtypes for the T_T100I_SEGMENT columns.
+# Ids use nullable integers so that missing values don't break parsing,
+# counts fit into float32, tonnages stay float64 because they can exceed float32 precision.
+SEGMENT_DTYPES = {
+    "DEPARTURES_SCHEDULED": "float32",
+    "DEPARTURES_PERFORMED": "float32",
+    "PAYLOAD": "float64",
+    "SEATS": "float32",
+    "PASSENGERS": "float32",
+    "FREIGHT": "float64",
+    "MAIL": "float64",
+    "DISTANCE": "float32",
+    "RAMP_TO_RAMP": "float32",
+    "AIR_TIME": "float32",
+    "UNIQUE_CARRIER": "str",
+    "AIRLINE_ID": "Int32",
+    "UNIQUE_CARRIER_NAME": "str",
+    "UNIQUE_CARRIER_ENTITY": "str",
+    "REGION": "str",
+    "CARRIER": "str",
+    "CARRIER_NAME": "str",
+    "CARRIER_GROUP": "Int8",
+    "CARRIER_GROUP_NEW": "Int8",
+    "ORIGIN_AIRPORT_ID": "Int32",
+    "ORIGIN_AIRPORT_SEQ_ID": "Int32",
+    "ORIGIN_CITY_MARKET_ID": "Int32",
+    "ORIGIN": "str",
+    "ORIGIN_CITY_NAME": "str",
+    "ORIGIN_COUNTRY": "str",
+    "ORIGIN_COUNTRY_NAME": "str",
+    "ORIGIN_WAC": "Int16",
+    "DEST_AIRPORT_ID": "Int32",
+    "DEST_AIRPORT_SEQ_ID": "Int32",
+    "DEST_CITY_MARKET_ID": "Int32",
+    "DEST": "str",
+    "DEST_CITY_NAME": "str",
+    "DEST_COUNTRY": "str",
+    "DEST_COUNTRY_NAME": "str",
+    "DEST_WAC": "Int16",
+    "AIRCRAFT_GROUP": "Int16",
+    "AIRCRAFT_TYPE": "Int16",
+    "AIRCRAFT_CONFIG": "Int16",
+    "YEAR": "Int16",
+    "QUARTER": "Int8",
+    "MONTH": "Int8",
+    "DISTANCE_GROUP": "Int8",
+    "CLASS": "str",
+}
+
+# Aggregations that can be applied to partial results again when folding chunks together
+FOLDABLE_AGGREGATIONS = {"sum", "first", "last", "min", "max"}
+
+
+# Read a yearly segment file lazily in fixed-size chunks, only with the requested columns
+def read_segment_chunks(path, columns, chunksize=CHUNKSIZE):
+    dtypes = {col: SEGMENT_DTYPES[col] for col in columns if col in SEGMENT_DTYPES}
+    return pd.read_csv(path, sep=",", usecols=columns, dtype=dtypes, chunksize=chunksize)
+
+
+# Load the valid connections from Excel as a MultiIndex for fast membership tests
+def load_connections(path="Data/Connections.xlsx"):
+    df_connections = pd.read_excel(path, dtype={"UNIQUE_CARRIER_ENTITY": str})
+    return pd.MultiIndex.from_frame(df_connections[CONNECTION_KEYS])
+
+
+# Keep only the rows of a chunk that belong to one of the given connections
+def filter_connections(chunk, connections):
+    keys = pd.MultiIndex.from_frame(chunk[CONNECTION_KEYS])
+    return chunk[keys.isin(connections)]
+
+
+# Stream one or more segment files and fold every chunk into running aggregates grouped by `keys`.
+# Memory is bounded by the chunk size plus the number of groups, not by the size or number of files.
+#   agg:         {column: aggregation}, only aggregations in FOLDABLE_AGGREGATIONS are allowed
+#   connections: optional MultiIndex of CONNECTION_KEYS, other rows are dropped before aggregating
+#   prepare:     optional function applied to each (filtered) chunk, e.g. to derive columns
+def aggregate_segments(files, columns, keys, agg, connections=None, prepare=None, chunksize=CHUNKSIZE):
+    unsupported = set(agg.values()) - FOLDABLE_AGGREGATIONS
+    if unsupported:
+        raise ValueError(f"Aggregations {sorted(unsupported)} cannot be computed chunk by chunk.")
+
+    if isinstance(files, str):
+        files = [files]
+
+    running = None
+    for path in files:
+        for chunk in timed(read_segment_chunks(path, columns, chunksize), "csv_read", file=path):
+            if connections is not None:
+                with stage("filter", rows=len(chunk)):
+                    chunk = filter_connections(chunk, connections)
+            if chunk.empty:
+                continue
+            if prepare is not None:
+                chunk = prepare(chunk)
+
+            with stage("groupby", rows=len(chunk)):
+                part = chunk.groupby(keys, sort=False).agg(agg)
+                if running is None:
+                    running = part
+                else:
+                    running = pd.concat([running, part]).groupby(level=keys, sort=False).agg(agg)
+
+    if running is None:
+        # No matching rows at all: return an empty frame with the expected layout
+        empty = pd.DataFrame(columns=list(keys) + list(agg))
+        return empty.set_index(keys)
+
+    return running.sort_index()
@@ -1,6 +1,11 @@
 import pandas as pd
+import numpy as np
 import json
-import math
+import argparse
+import profiling
+from profiling import stage
+from ingest import aggregate_segments, load_connections
+from datastore import write_grouped
 
 # Function to create a unique key for each connection
 def make_key(air, uce, org, dst, atp):
@@ -29,58 +34,119 @@ airports_df = pd.read_csv("airports.dat", header=None, names=[
 iata_to_name = dict(zip(airports_df["IATA"], airports_df["Name"]))
 iata_to_coords = airports_df.drop_duplicates(subset=["IATA"]).set_index("IATA")[["Latitude", "Longitude"]].dropna().to_dict(orient="index")
 
-def preprocess():
-    # List of raw flight connection data files
-    files = [
-        "Data/T_T100I_SEGMENT_ALL_CARRIER_2022.csv",
-        "Data/T_T100I_SEGMENT_ALL_CARRIER_2023.csv",
-        "Data/T_T100I_SEGMENT_ALL_CARRIER_2024.csv"
-    ]
+# Aggregation per connection and month. Columns listed in columns_to_keep take their first value.
+aggregations = {
+    "PASSENGERS": "sum",
+    "SEATS": "sum",
+    "DEPARTURES_PERFORMED": "sum",
+    **{col: "first" for col in columns_to_keep}
+}
+
+# Create the unique keys for all rows of a dataframe at once (same format as make_key)
+def make_keys(df):
+    return (
+        df["AIRLINE_ID"].astype(str) + "-" +
+        df["UNIQUE_CARRIER_ENTITY"].astype(str) + "-" +
+        df["ORIGIN"].astype(str) + "-" +
+        df["DEST"].astype(str) + "-" +
+        df["AIRCRAFT_TYPE"].astype(str)
+    )
+
+# Add the unique connection key to a chunk of raw rows
+def add_con_key(chunk):
+    return chunk.assign(con_key=make_keys(chunk))
+
+# Average passengers per flight (rounded up), 0 for months without departures
+def avg_pax_per_flight(passengers, departures):
+    flown = departures > 0
+    return np.ceil(passengers / departures.where(flown)).where(flown, 0).astype("int64")
+
+# Load factor (passengers divided by seats), 0 for months without seats
+def load_factor(passengers, seats):
+    has_seats = seats > 0
+    return (passengers / seats.where(has_seats)).where(has_seats, 0.0)
+
+# Raw flight connection data files per year
+YEAR_FILES = {
+    2022: "Data/T_T100I_SEGMENT_ALL_CARRIER_2022.csv",
+    2023: "Data/T_T100I_SEGMENT_ALL_CARRIER_2023.csv",
+    2024: "Data/T_T100I_SEGMENT_ALL_CARRIER_2024.csv"
+}
+
+GROUP_KEYS = ["con_key", "YEAR", "MONTH"]
+
+
+# Aggregations of the raw columns per group, without the group keys themselves
+def group_aggregations(keys):
+    return {col: how for col, how in aggregations.items() if col not in keys}
+
+
+# Finish aggregated segments (a con_key column and all columns of aggregations): preprocess column
+# order, the flows as float64 and the derived metrics
+def finish_grouped(grouped):
+    grouped = grouped[["con_key", *aggregations]]
+    grouped[["PASSENGERS", "SEATS", "DEPARTURES_PERFORMED"]] = grouped[["PASSENGERS", "SEATS", "DEPARTURES_PERFORMED"]].astype("float64")
+    
+    with stage("metrics", rows=len(grouped)):
+        # Calculate Average Passengers per Flight (rounded up)
+        grouped["AVG_PAX_PER_FLIGHT"] = avg_pax_per_flight(grouped["PASSENGERS"], grouped["DEPARTURES_PERFORMED"])
+
+        # Calculate Load Factor (passengers divided by seats)
+        grouped["LOAD_FACTOR"] = load_factor(grouped["PASSENGERS"], grouped["SEATS"])
+    return grouped
+
+
+# Stream raw segment file(s) in chunks, keep only the valid connections and group them by connection
+# key, year and month while reading.
+# Returns the grouped rows with the derived metrics, one row per (con_key, YEAR, MONTH).
+def group_segments(files, connections):
+    def prepare(chunk):
+        with stage("key_build", rows=len(chunk)):
+            return add_con_key(chunk)
+
+    grouped = aggregate_segments(files, columns_to_keep, GROUP_KEYS, group_aggregations(GROUP_KEYS),
+                                 connections=connections, prepare=prepare).reset_index()
+    return finish_grouped(grouped)
+
+
+# Add the airport coordinates of origin and destination
+def add_coordinates(grouped):
+    with stage("coordinates", rows=len(grouped)):
+        grouped["ORIGIN_LAT"] = grouped["ORIGIN"].map(lambda x: iata_to_coords.get(x, {}).get("Latitude"))
+        grouped["ORIGIN_LON"] = grouped["ORIGIN"].map(lambda x: iata_to_coords.get(x, {}).get("Longitude"))
+        grouped["DEST_LAT"] = grouped["DEST"].map(lambda x: iata_to_coords.get(x, {}).get("Latitude"))
+        grouped["DEST_LON"] = grouped["DEST"].map(lambda x: iata_to_coords.get(x, {}).get("Longitude"))
+    return grouped
+
+
+# Write the route dropdown options (all ORIGIN-DEST pairs of the grouped data) for the dashboards
+def write_route_options(grouped, path="Data/valid_routes.json"):
+    # Create unique ORIGIN-DEST combinations
+    route_pairs = grouped.groupby(["ORIGIN", "DEST"], as_index=False).first()
+    # Build route dropdown
+    route_dropdown = []
+    for _, row in route_pairs.iterrows():
+        origin = row["ORIGIN"]
+        dest = row["DEST"]
+        label = f"{iata_to_name.get(origin, origin)} ({origin}) → {iata_to_name.get(dest, dest)} ({dest})"
+        route_dropdown.append({"label": label, "value": f"{origin}-{dest}"})
+
+    # Save it
+    with open(path, "w") as f:
+        json.dump(route_dropdown, f)
+
 
+def preprocess(year_files=YEAR_FILES):
     #Load Excel file with valid connections
-    df_connections = pd.read_excel("Data/Connections.xlsx")
-    
-    # Convert the valid connections into a set of keys for easier lookup
-    passed = [tuple(row) for row in df_connections.values]
-    passed_keys = {make_key(*con): con for con in passed}
+    connections = load_connections("Data/Connections.xlsx")
 
     # Prepare an empty list to hold all processed dataframes
     all_grouped = []
     
     # Iterate over each year file and process the data
-    for f, year in zip(files, [2022, 2023, 2024]):
-        df = pd.read_csv(f)
-        # Create a unique connection key for each row
-        df["con_key"] = df.apply(lambda row: make_key(
-            row["AIRLINE_ID"],
-            row["UNIQUE_CARRIER_ENTITY"],
-            row["ORIGIN"],
-            row["DEST"],
-            row["AIRCRAFT_TYPE"]
-        ), axis=1)
-        
-        # Filter the dataframe to include only valid connections
-        filtered = df[df["con_key"].isin(passed_keys)]
-        
-        # Group the filtered data by connection key and month, then aggregate the numeric values
-        grouped = filtered.groupby(["con_key", "YEAR", "MONTH"], as_index=False).agg({
-            "PASSENGERS": "sum",
-            "SEATS": "sum",
-            "DEPARTURES_PERFORMED": "sum",
-            **{col: "first" for col in columns_to_keep}
-            })
-        
-        # Calculate Average Passengers per Flight (rounded up)
-        grouped["AVG_PAX_PER_FLIGHT"] = grouped.apply(
-            lambda row: math.ceil(row["PASSENGERS"] / row["DEPARTURES_PERFORMED"]) if row["DEPARTURES_PERFORMED"] > 0 else 0,
-            axis=1
-        )
-        
-        # Calculate Load Factor (passengers divided by seats)
-        grouped["LOAD_FACTOR"] = grouped.apply(
-            lambda row: row["PASSENGERS"] / row["SEATS"] if row["SEATS"] > 0 else 0,
-            axis=1
-        )
+    for year, f in year_files.items():
+        with stage("group_year", year=year, file=f):
+            grouped = group_segments(f, connections)
 
         # Add the year column to the grouped data
         grouped["YEAR"] = year
@@ -89,42 +155,32 @@ def preprocess():
         all_grouped.append(grouped)
 
     # Concatenate all years' grouped data into a single DataFrame
-    final_grouped = pd.concat(all_grouped, ignore_index=True)
+    final_grouped = add_coordinates(pd.concat(all_grouped, ignore_index=True))
 
-    
-    final_grouped["ORIGIN_LAT"] = final_grouped["ORIGIN"].map(lambda x: iata_to_coords.get(x, {}).get("Latitude"))
-    final_grouped["ORIGIN_LON"] = final_grouped["ORIGIN"].map(lambda x: iata_to_coords.get(x, {}).get("Longitude"))
-    final_grouped["DEST_LAT"] = final_grouped["DEST"].map(lambda x: iata_to_coords.get(x, {}).get("Latitude"))
-    final_grouped["DEST_LON"] = final_grouped["DEST"].map(lambda x: iata_to_coords.get(x, {}).get("Longitude"))
     # Save the final grouped data into a single CSV file
-    final_grouped.to_csv("Data/Grouped_All_Valid_Connections.csv", index=False)
+    with stage("write_csv", rows=len(final_grouped)):
+        final_grouped.to_csv("Data/Grouped_All_Valid_Connections.csv", index=False)
+    # ... and as Parquet dataset partitioned by year for fast typed loading
+    with stage("write_parquet", rows=len(final_grouped)):
+        write_grouped(final_grouped)
 
     # Print the summary of processed rows
     print(f"Total filtered and grouped rows saved: {len(final_grouped)}")
 
-    
-
-    # Sample a dataframe from the first year to get the connection labels
-    sample_df = all_grouped[0][all_grouped[0]["con_key"].isin(passed_keys)]
-    
-    
-    # Create unique ORIGIN-DEST combinations
-    route_pairs = final_grouped.groupby(["ORIGIN", "DEST"], as_index=False).first()
-    # Build route dropdown
-    route_dropdown = []
-    for _, row in route_pairs.iterrows():
-        origin = row["ORIGIN"]
-        dest = row["DEST"]
-        label = f"{iata_to_name.get(origin, origin)} ({origin}) → {iata_to_name.get(dest, dest)} ({dest})"
-        route_dropdown.append({"label": label, "value": f"{origin}-{dest}"})
-
-    # Save it
-    with open("Data/valid_routes.json", "w") as f:
-        json.dump(route_dropdown, f)
+    # Route dropdown for the dashboards
+    with stage("route_options"):
+        write_route_options(final_grouped)
 
  
 if __name__ == "__main__":
-    preprocess()
+    parser = argparse.ArgumentParser(description="Group the valid connections of the raw yearly files.")
+    parser.add_argument("--trace", help=f"write a timing trace of the stages to this file (or set {profiling.TRACE_ENV})")
+    parser.add_argument("--profile", help="run these stages (comma separated, or all) under cProfile")
+    args = parser.parse_args()
+    profiling.configure(args.trace, args.profile)
+
+    with stage("preprocess"):
+        preprocess()
 
 
 
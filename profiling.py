@@ -0,0 +1,169 @@
+#! /usr/bin/python3
+# Opt-in timing instrumentation of the offline pipeline (ingest, preprocess, analysis).
+#
+# Off by default; the stages then cost one function call each. Enabled with
+#   PIPELINE_TRACE=FILE    write one event per stage run to FILE (or --trace FILE of preprocess.py / analysis.py)
+#   PIPELINE_PROFILE=NAMES also run the named stages (comma separated, "all" for every stage) under cProfile
+#                          and dump the stats next to the trace as FILE.<stage>.<pid>.prof (or --profile NAMES)
+# Both are passed on to worker processes through the environment.
+#
+# A trace FILE ending in .json is written in Chrome trace format (open it in chrome://tracing or Perfetto),
+# any other name as JSON lines. Events are appended as they happen, so several processes (the analysis
+# workers, or Connection_473.py -> preprocess.py -> analysis.py one after another) can write into the same
+# file. Every event has the stage name, start (ts) and duration (dur) in microseconds, the CPU time of the
+# process in the stage, pid/tid and the arguments of the stage (e.g. the route of a model fit).
+#
+#   python profiling.py FILE [--top 10]    summary per stage and the slowest stage runs
+import os
+import sys
+import json
+import time
+import argparse
+import cProfile
+import threading
+from contextlib import contextmanager, nullcontext
+
+TRACE_ENV = "PIPELINE_TRACE"
+PROFILE_ENV = "PIPELINE_PROFILE"
+
+trace_file = os.environ.get(TRACE_ENV) or None
+profile_stages = {name for name in os.environ.get(PROFILE_ENV, "").split(",") if name}
+
+# cProfile objects per stage name of this process, collecting all runs of the stage
+profiles = {}
+profiling_active = False
+
+
+# Enable tracing (and profiling of the given stage names) for this process and its workers.
+# Without arguments the environment variables decide.
+def configure(trace=None, profile=None):
+    global trace_file, profile_stages
+    if trace:
+        trace_file = os.path.abspath(trace)
+        os.environ[TRACE_ENV] = trace_file
+    if profile:
+        profile_stages = {name for name in profile.split(",") if name}
+        os.environ[PROFILE_ENV] = ",".join(sorted(profile_stages))
+
+
+def enabled():
+    return trace_file is not None
+
+
+def write_event(event):
+    chrome = trace_file.endswith(".json")
+    line = json.dumps(event) + (",\n" if chrome else "\n")
+    # Appends of single lines don't interleave between processes
+    with open(trace_file, "a") as f:
+        # Chrome trace array format: the closing bracket is optional, so the file stays appendable
+        if chrome and f.tell() == 0:
+            line = "[\n" + line
+        f.write(line)
+
+
+# Dump the cProfile stats of a stage, all runs of it in this process so far
+def dump_profile(name, profile):
+    base = trace_file if trace_file else "pipeline"
+    profile.dump_stats(f"{base}.{name}.{os.getpid()}.prof")
+
+
+# Time one run of a pipeline stage:
+#   with stage("groupby", file=path):
+#       ...
+# Nothing is recorded unless tracing is enabled.
+def stage(name, **args):
+    if trace_file is None and not profile_stages:
+        return nullcontext()
+    return traced_stage(name, args)
+
+
+@contextmanager
+def traced_stage(name, args):
+    global profiling_active
+    # cProfile can't profile nested stages separately, the outer one collects everything
+    profile = None
+    if not profiling_active and ("all" in profile_stages or name in profile_stages):
+        profile = profiles.setdefault(name, cProfile.Profile())
+        profiling_active = True
+        profile.enable()
+
+    start_us = time.time_ns() // 1000
+    start = time.perf_counter()
+    start_cpu = time.process_time()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        cpu_seconds = time.process_time() - start_cpu
+        if profile is not None:
+            profile.disable()
+            profiling_active = False
+            dump_profile(name, profile)
+        if trace_file is not None:
+            write_event({
+                "name": name, "ph": "X", "ts": start_us, "dur": round(seconds * 1e6),
+                "pid": os.getpid(), "tid": threading.get_native_id(),
+                "args": {**{key: str(value) for key, value in args.items()}, "cpu_ms": round(cpu_seconds * 1000, 3)},
+            })
+
+
+# Iterate over `iterable` and time the production of every item as a run of the stage, e.g. reading
+# the next chunk of a CSV file
+def timed(iterable, name, **args):
+    if trace_file is None and not profile_stages:
+        yield from iterable
+        return
+
+    iterator = iter(iterable)
+    while True:
+        with stage(name, **args):
+            item = next(iterator, StopIteration)
+        if item is StopIteration:
+            return
+        yield item
+
+
+# Events of a trace file in either format
+def read_events(path):
+    with open(path) as f:
+        for line in f:
+            line = line.strip().lstrip("[").rstrip(",").rstrip("]")
+            if line:
+                yield json.loads(line)
+
+
+# Per stage: runs, total/mean/max wall time and total CPU time in seconds, slowest stage first
+def summarize(events):
+    stages = {}
+    for event in events:
+        seconds = event["dur"] / 1e6
+        total = stages.setdefault(event["name"], {"runs": 0, "seconds": 0.0, "max_seconds": 0.0, "cpu_seconds": 0.0})
+        total["runs"] += 1
+        total["seconds"] += seconds
+        total["max_seconds"] = max(total["max_seconds"], seconds)
+        total["cpu_seconds"] += event["args"].get("cpu_ms", 0) / 1000
+    for total in stages.values():
+        total["mean_seconds"] = total["seconds"] / total["runs"]
+    return dict(sorted(stages.items(), key=lambda item: -item[1]["seconds"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a pipeline trace written with PIPELINE_TRACE / --trace.")
+    parser.add_argument("trace", help="trace file (JSON lines or Chrome trace)")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest stage runs to list")
+    args = parser.parse_args()
+
+    events = list(read_events(args.trace))
+    print(f"{'stage':<24} {'runs':>7} {'total s':>10} {'mean ms':>10} {'max ms':>10} {'cpu s':>10}")
+    for name, total in summarize(events).items():
+        print(f"{name:<24} {total['runs']:>7} {total['seconds']:>10.3f} {total['mean_seconds'] * 1000:>10.2f} "
+              f"{total['max_seconds'] * 1000:>10.2f} {total['cpu_seconds']:>10.3f}")
+
+    print(f"\nSlowest {args.top} stage runs:")
+    for event in sorted(events, key=lambda event: -event["dur"])[:args.top]:
+        details = ", ".join(f"{key}={value}" for key, value in event["args"].items() if key != "cpu_ms")
+        print(f"{event['dur'] / 1000:10.2f} ms  {event['name']:<24} {details}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+#! /usr/bin/python3
+# Production server for the dashboards: gunicorn with several worker processes instead of the
+# single-threaded development server of app.run(debug=True).
+#
+# The dashboard module is imported once in the master process (preload_app) before the workers are
+# forked, so the data, the indexes and the app are built once and all workers share those memory pages
+# copy-on-write (with the files of shared_data.py they map the same data anyway). Every worker serves
+# its own requests, so up to --workers forecasts are fitted at the same time.
+# The dashboards expose their WSGI application as `server`, so any WSGI server works as well, e.g.
+#   gunicorn --preload --workers 4 --timeout 120 dashboard:server
+#
+#   python serve.py [--app dashboard] [--workers N] [--threads 1] [--bind 0.0.0.0:8050] [--timeout 120]
+import os
+import sys
+import argparse
+import importlib
+
+DASHBOARDS = ["dashboard", "dashboard_auto", "Dash", "SARIMA_VAL24"]
+
+
+# Gunicorn settings: preloaded app, worker count from --workers / DASHBOARD_WORKERS (default: one per CPU)
+def server_options(args):
+    return {
+        "bind": args.bind,
+        "workers": args.workers,
+        "threads": args.threads,
+        # A forecast fit keeps a worker busy for seconds, gunicorn's default timeout of 30s is too tight
+        "timeout": args.timeout,
+        "preload_app": True,
+        "accesslog": "-" if args.access_log else None,
+    }
+
+
+def run(app_module, options):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("gunicorn is not installed (pip install gunicorn). Other WSGI servers can serve "
+              f"{app_module}:server directly.")
+        sys.exit(1)
+
+    class DashboardApplication(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        # Called once in the master with preload_app
+        def load(self):
+            return importlib.import_module(app_module).server
+
+    DashboardApplication().run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a dashboard with gunicorn worker processes.")
+    parser.add_argument("--app", choices=DASHBOARDS, default="dashboard", help="dashboard module to serve")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("DASHBOARD_WORKERS", os.cpu_count() or 1)),
+                        help="number of worker processes (default: DASHBOARD_WORKERS or the number of CPUs)")
+    parser.add_argument("--threads", type=int, default=1, help="threads per worker")
+    parser.add_argument("--bind", default=os.environ.get("DASHBOARD_BIND", "0.0.0.0:8050"), help="address to listen on")
+    parser.add_argument("--timeout", type=int, default=120, help="seconds before a busy worker is restarted")
+    parser.add_argument("--access-log", action="store_true", help="log every request to stdout")
+    args = parser.parse_args()
+
+    run(args.app, server_options(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+from datastore import load_grouped, dataset_fingerprint
+from forecasting import ROUTE_INDEX_ORDER
+
+# The dashboard data materialized once as one .npy file per column, written by this script. Worker
+# processes memory-map the files read-only, so the pages are shared between all workers on a host and
+# a new worker attaches without parsing anything.
+SHARED_DATA_DIR = "Data/shared_dashboard_data"
+META_FILE = "meta.json"
+
+# Columns of the grouped data used by the dashboard
+DASHBOARD_COLUMNS = [
+    "YEAR", "MONTH", "ORIGIN", "DEST", "UNIQUE_CARRIER_NAME", "PASSENGERS", "SEATS",
+    "ORIGIN_LAT", "ORIGIN_LON", "DEST_LAT", "DEST_LON"
+]
+
+
+# Load the dashboard data: the used columns (compact, see datastore.compact_grouped) and DATE.
+# The rows are (stable) sorted by route and airline, so build_route_index can index the slices.
+def load_dashboard_data(compact=True):
+    data = load_grouped(DASHBOARD_COLUMNS, compact=compact)
+    data["DATE"] = pd.to_datetime(data["YEAR"].astype(str) + "-" + data["MONTH"].astype(str) + "-01")
+    return data.sort_values(ROUTE_INDEX_ORDER, kind="stable", ignore_index=True)
+
+
+def column_file(path, col):
+    return os.path.join(path, f"{col}.npy")
+
+
+# Write the data as shared files: categoricals as their codes (categories in the meta file), nullable
+# integers as plain NumPy arrays (float64 with NaN if they have missing values).
+# The files are written to a new directory that replaces the old one at once; workers that still
+# map the old files keep reading them until they restart.
+def write_shared_data(data, path=SHARED_DATA_DIR):
+    tmp_path = path + ".tmp"
+    if os.path.isdir(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+
+    meta = {"fingerprint": dataset_fingerprint(), "rows": len(data), "columns": {}}
+    for col in data.columns:
+        values = data[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            np.save(column_file(tmp_path, col), values.cat.codes.to_numpy())
+            meta["columns"][col] = {"categories": values.cat.categories.tolist()}
+            continue
+
+        if pd.api.types.is_extension_array_dtype(values.dtype):
+            if values.hasnans:
+                values = values.to_numpy(dtype="float64", na_value=np.nan)
+            else:
+                values = values.to_numpy(dtype=values.dtype.numpy_dtype)
+        np.save(column_file(tmp_path, col), np.asarray(values))
+        meta["columns"][col] = {}
+
+    with open(os.path.join(tmp_path, META_FILE), "w") as f:
+        json.dump(meta, f)
+
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.rename(tmp_path, path)
+    print(f"{len(data)} rows, {len(data.columns)} columns written to {path}")
+
+
+# Attach to the shared files: a DataFrame whose columns are read-only memory maps of them (no copy).
+# Returns None if the files don't exist or were written from other data than the current one.
+def attach_shared_data(path=SHARED_DATA_DIR):
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+
+    with open(meta_path) as f:
+        meta = json.load(f)
+    if meta["fingerprint"] != dataset_fingerprint():
+        print(f"Ignoring {path}: written from other data, run shared_data.py again")
+        return None
+
+    columns = {}
+    for col, info in meta["columns"].items():
+        # Plain ndarray view of the map, pandas doesn't need to know about np.memmap
+        values = np.load(column_file(path, col), mmap_mode="r").view(np.ndarray)
+        if "categories" in info:
+            values = pd.Categorical.from_codes(values, categories=info["categories"], validate=False)
+        columns[col] = values
+
+    # copy=False keeps every column as its own block backed by the memory map
+    return pd.DataFrame(columns, copy=False)
+
+
+if __name__ == "__main__":
+    write_shared_data(load_dashboard_data(compact=True))
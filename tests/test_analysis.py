@@ -0,0 +1,106 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("statsmodels")
+import analysis
+
+
+# Monthly passengers of a few routes with trend, seasonality and some spikes, rows in random order.
+# Routes of three and four years are stacked in different panels, the one with a gap is skipped.
+def route_groups(seed=0):
+    rng = np.random.default_rng(seed)
+    groups = []
+    for i, months in enumerate([36, 36, 48, 48, 48]):
+        t = np.arange(months)
+        passengers = (rng.uniform(5_000, 20_000) + rng.uniform(-40, 80) * t
+                      + rng.uniform(500, 3_000) * np.sin(2 * np.pi * (t + i) / 12)
+                      + rng.normal(0, 200, months))
+        passengers[rng.choice(months, 2, replace=False)] *= 1.5
+        dates = pd.date_range(f"{2024 - months // 12 + 1}-01-01", periods=months, freq="MS")
+        route_df = pd.DataFrame({"DATE": dates, "PASSENGERS": passengers})
+        groups.append((f"R{i} → X", route_df.sample(frac=1, random_state=i)))
+
+    gap = groups[0][1].copy()
+    gap.loc[gap.index[5], "PASSENGERS"] = np.nan
+    groups.append(("G → X", gap))
+    return groups
+
+
+def test_panel_metrics_match_route_insight():
+    groups = route_groups()
+    metrics = analysis.panel_route_metrics(groups)
+
+    assert set(metrics) == {route for route, _ in groups} - {"G → X"}
+    for route, route_df in groups:
+        # The Holt-Winters MAE is not compared, skip its fit
+        expected = analysis.route_insight(route, route_df, mae_hw=np.nan)
+        actual = analysis.route_insight(route, route_df, mae_hw=np.nan, metrics=metrics.get(route))
+        if expected is None:
+            assert route not in metrics
+            continue
+
+        assert actual["trend_slope"] == pytest.approx(expected["trend_slope"], abs=0.01)
+        assert actual["season_amp_pct"] == pytest.approx(expected["season_amp_pct"], abs=0.1)
+        assert actual["outlier_count"] == expected["outlier_count"]
+    assert sum(metrics[route][2] for route in metrics) > 0
+
+
+# Grouped rows (one per route and month) of the routes of route_groups without gaps
+def grouped_rows(groups):
+    rows = [route_df.assign(ORIGIN=route.split(" → ")[0], DEST=route.split(" → ")[1])
+            for route, route_df in groups if route != "G → X"]
+    return pd.concat(rows, ignore_index=True)
+
+
+def test_changed_route_only_changes_its_row(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "Data").mkdir()
+    df = grouped_rows(route_groups())
+    first = analysis.generate_route_insights(df.copy()).set_index("route")
+
+    # One month of R2 → X changes, the other routes are taken over without a refit
+    changed = df.copy()
+    changed.loc[changed[changed["ORIGIN"] == "R2"].index[0], "PASSENGERS"] += 5_000
+    fitted = []
+    route_insight = analysis.route_insight
+    monkeypatch.setattr(analysis, "route_insight", lambda route, *args: fitted.append(route) or route_insight(route, *args))
+    second = analysis.generate_route_insights(changed, incremental=True).set_index("route")
+
+    assert fitted == ["R2 → X"]
+    assert first.loc["R2 → X", "input_hash"] != second.loc["R2 → X", "input_hash"]
+    assert first.loc["R2 → X", "trend_slope"] != second.loc["R2 → X", "trend_slope"]
+    pd.testing.assert_frame_equal(second.drop(index="R2 → X"), first.drop(index="R2 → X").loc[second.index.drop("R2 → X")])
+
+
+# A route flown by several connections (airlines, aircraft types) is analysed on its monthly totals:
+# S → X carries the passengers of R2 → X split over two connections and gets the same insight row
+def test_insights_of_a_route_are_computed_on_its_monthly_totals(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "Data").mkdir()
+    df = grouped_rows(route_groups())
+    half = df[df["ORIGIN"] == "R2"].assign(ORIGIN="S", PASSENGERS=lambda rows: rows["PASSENGERS"] * 0.5)
+    df = pd.concat([df, half, half.sample(frac=1, random_state=0)], ignore_index=True)
+
+    insights = analysis.generate_route_insights(df).set_index("route")
+
+    pd.testing.assert_series_equal(insights.loc["S → X"], insights.loc["R2 → X"], check_names=False)
+
+
+# With panel metrics, a route flown by several connections gets the metrics of its monthly totals too
+def test_panel_metrics_of_a_route_with_several_connections(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "Data").mkdir()
+    df = grouped_rows(route_groups())
+    half = df[df["ORIGIN"] == "R3"].assign(PASSENGERS=lambda rows: rows["PASSENGERS"] * 0.5)
+    split = pd.concat([df[df["ORIGIN"] != "R3"], half, half.sample(frac=1, random_state=0)], ignore_index=True)
+
+    columns = ["trend_slope", "season_amp_pct", "outlier_count"]
+    expected = analysis.generate_route_insights(df.copy()).set_index("route")[columns]
+    actual = analysis.generate_route_insights(split, panel=True).set_index("route")[columns]
+
+    pd.testing.assert_frame_equal(actual.sort_index(), expected.sort_index(), check_exact=False, atol=0.01)
@@ -0,0 +1,79 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("statsforecast")
+import auto_SARIMA
+
+
+# Three years of monthly passengers with trend and seasonality, one row per connection and month.
+# A → B has one connection, C → D the same monthly totals split over two connections.
+def grouped_rows():
+    dates = pd.date_range("2022-01-01", periods=36, freq="MS")
+    months = np.arange(36)
+    passengers = 10000 + 50 * months + 1500 * np.sin(2 * np.pi * months / 12)
+    single = pd.DataFrame({"ROUTE": "A → B", "DATE": dates, "PASSENGERS": passengers})
+    split = pd.concat([
+        pd.DataFrame({"ROUTE": "C → D", "DATE": dates, "PASSENGERS": passengers * 0.25}),
+        pd.DataFrame({"ROUTE": "C → D", "DATE": dates, "PASSENGERS": passengers * 0.75}),
+    ])
+    df = pd.concat([single, split], ignore_index=True)
+    return df[df["DATE"] < "2024-01-01"], df[df["DATE"] >= "2024-01-01"]
+
+
+def test_route_with_several_connections_is_summed_per_month():
+    train, valid = grouped_rows()
+    maes = auto_SARIMA.autoarima_mae(train, valid)
+
+    assert not np.isnan(maes["A → B"])
+    assert maes["C → D"] == pytest.approx(maes["A → B"])
+
+
+def test_failing_batch_falls_back_to_single_routes(monkeypatch):
+    train, valid = grouped_rows()
+    fit_panel = auto_SARIMA.panel_autoarima_mae
+
+    # The batched call and the refit of C → D fail, A → B is still fitted on its own
+    def failing(panel, actual, h):
+        if panel["unique_id"].nunique() > 1 or (panel["unique_id"] == "C → D").any():
+            raise ValueError("fit failed")
+        return fit_panel(panel, actual, h)
+
+    monkeypatch.setattr(auto_SARIMA, "panel_autoarima_mae", failing)
+    maes = auto_SARIMA.autoarima_mae(train, valid)
+
+    assert not np.isnan(maes["A → B"])
+    assert np.isnan(maes["C → D"])
+
+
+def insight_rows(df):
+    df = df.assign(ORIGIN=df["ROUTE"].str[0], DEST=df["ROUTE"].str[-1])
+    return df.drop(columns="ROUTE")
+
+
+def test_insights_of_a_route_are_computed_on_its_monthly_totals(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "Data").mkdir()
+    train, valid = grouped_rows()
+
+    insights = auto_SARIMA.generate_route_insights(insight_rows(pd.concat([train, valid]))).set_index("route")
+
+    # Trend, seasonality, outliers and both models see the same series for both routes
+    pd.testing.assert_series_equal(insights.loc["C → D"], insights.loc["A → B"], check_names=False)
+    assert not np.isnan(insights.loc["A → B", "mae_holt"])
+    assert not np.isnan(insights.loc["A → B", "mae_sarima"])
+
+
+def test_no_route_with_enough_months_gives_no_insights(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "Data").mkdir()
+    train, _ = grouped_rows()
+
+    insights = auto_SARIMA.generate_route_insights(insight_rows(train))
+
+    assert insights.empty
+    assert "mae_sarima" in insights.columns
@@ -0,0 +1,29 @@
+import os
+import sys
+import importlib
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+pytest.importorskip("dash")
+from synthetic import synthetic_grouped, write_dashboard_inputs
+
+
+# Start a dashboard module on synthetic inputs in tmp_path
+def start_dashboard(name, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_dashboard_inputs(synthetic_grouped(30), str(tmp_path))
+    monkeypatch.delitem(sys.modules, name, raising=False)
+    return importlib.import_module(name)
+
+
+# The input hashes analysis.py stores with the insights are neither a table column nor in the table data
+@pytest.mark.parametrize("name", ["dashboard", "dashboard_auto"])
+def test_input_hash_is_not_in_the_analysis_table(name, tmp_path, monkeypatch):
+    dashboard = start_dashboard(name, tmp_path, monkeypatch)
+    table = dashboard.app.layout["analysis-table"]
+
+    assert "input_hash" not in {column["id"] for column in table.columns}
+    assert table.data and all("input_hash" not in row for row in table.data)
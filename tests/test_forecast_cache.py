@@ -0,0 +1,37 @@
+import os
+import sys
+import multiprocessing
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("diskcache")
+from forecast_cache import ForecastCache, disk_cache
+
+
+def fit_in_job(path):
+    cache = ForecastCache("v1", disk=disk_cache(path))
+    cache.get_or_compute("A-B", None, "sarima", 2025, lambda: {"forecast": [1.0, 2.0]})
+
+
+def test_forecast_of_a_finished_job_process_is_reused(tmp_path):
+    # Background callbacks fit the forecast in a short-lived process
+    job = multiprocessing.get_context("fork").Process(target=fit_in_job, args=(str(tmp_path),))
+    job.start()
+    job.join()
+    assert job.exitcode == 0
+
+    def refit():
+        raise AssertionError("forecast fitted again")
+
+    cache = ForecastCache("v1", disk=disk_cache(str(tmp_path)))
+    assert cache.get_or_compute("A-B", "all", "sarima", 2025, refit) == {"forecast": [1.0, 2.0]}
+    assert cache.hits == 1 and cache.misses == 0
+
+
+def test_other_data_version_is_fitted_again(tmp_path):
+    ForecastCache("v1", disk=disk_cache(str(tmp_path))).get_or_compute("A-B", None, "sarima", 2025, lambda: 1)
+
+    cache = ForecastCache("v2", disk=disk_cache(str(tmp_path)))
+    assert cache.get_or_compute("A-B", None, "sarima", 2025, lambda: 2) == 2
+    assert cache.misses == 1
@@ -0,0 +1,72 @@
+import os
+import sys
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+pytest.importorskip("pyarrow")
+from forecasting import build_route_index, lookup_route_rows, prepare_forecast_data
+from shared_data import load_dashboard_data
+from synthetic import synthetic_grouped, write_dashboard_inputs
+
+
+# Compact dashboard data of synthetic connections, several airlines per route
+@pytest.fixture
+def data(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_dashboard_inputs(synthetic_grouped(30), str(tmp_path))
+    return load_dashboard_data(compact=True)
+
+
+# Every route with its first airline, all airlines, a cleared airline dropdown and an airline without rows
+def selections(data):
+    for (origin, dest), route_df in data.groupby(["ORIGIN", "DEST"], observed=True):
+        airline = route_df["UNIQUE_CARRIER_NAME"].iloc[0]
+        for selected in [airline, "all", None, "No Such Airline"]:
+            yield origin, dest, selected
+
+
+# Rows of a selection as the dashboard filtered them before the index: boolean masks on the whole frame
+def mask_rows(data, origin, dest, airline):
+    df = data[(data["ORIGIN"] == origin) & (data["DEST"] == dest)]
+    if airline and airline != "all":
+        df = df[df["UNIQUE_CARRIER_NAME"] == airline]
+    return df
+
+
+def test_lookup_matches_boolean_masks(data):
+    route_index = build_route_index(data)
+
+    for origin, dest, airline in selections(data):
+        pd.testing.assert_frame_equal(lookup_route_rows(route_index, origin, dest, airline),
+                                      mask_rows(data, origin, dest, airline))
+    assert lookup_route_rows(route_index, "XXX", "YYY").empty
+
+
+def test_forecast_data_from_the_index_matches_filtering(data):
+    route_index = build_route_index(data)
+
+    for origin, dest, airline in selections(data):
+        route = f"{origin} → {dest}"
+        if airline == "No Such Airline":
+            for index in (None, route_index):
+                with pytest.raises(ValueError):
+                    prepare_forecast_data(data, route, airline, route_index=index)
+            continue
+
+        expected = prepare_forecast_data(data, route, airline)
+        actual = prepare_forecast_data(data, route, airline, route_index=route_index)
+        columns = ["DATE", "PASSENGERS", "SEATS", "LOAD_FACTOR", "YEAR", "MONTH"]
+        pd.testing.assert_frame_equal(actual[columns].reset_index(drop=True), expected[columns].reset_index(drop=True),
+                                      check_dtype=False)
+
+
+def test_airline_names_of_a_route(data):
+    route_index = build_route_index(data)
+
+    for (origin, dest), route_df in data.groupby(["ORIGIN", "DEST"], observed=True):
+        expected = sorted(route_df["UNIQUE_CARRIER_NAME"].dropna().unique())
+        assert route_index["airline_names"][(origin, dest)] == expected
@@ -0,0 +1,106 @@
+import os
+import sys
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+pytest.importorskip("statsmodels")
+import analysis
+import holtwinters
+from holtwinters_batch import synthetic_panel
+
+# Forecasts and MAE of the engine and statsmodels have to agree within this fraction of the series mean
+# where both find the same optimum (sums of squared errors within SSE_TOLERANCE). statsmodels sometimes
+# stops in a local optimum, there the engine has to find a lower error instead.
+TOLERANCE = 1e-3
+SSE_TOLERANCE = 1e-4
+
+
+def statsmodels_fit(series):
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return ExponentialSmoothing(series, trend="add", seasonal="add", seasonal_periods=12).fit()
+
+
+# Three years of synthetic routes: two years of training, 2024 for validation
+def routes(n_routes=8, seed=1):
+    y = synthetic_panel(np.random.default_rng(seed), n_routes, 36)
+    dates = pd.date_range("2022-01-01", periods=36, freq="MS")
+    return [(f"R{i} → X", pd.DataFrame({"DATE": dates, "PASSENGERS": series})) for i, series in enumerate(y)]
+
+
+def test_batch_fit_matches_statsmodels():
+    y = synthetic_panel(np.random.default_rng(0), 12, 36)
+    train, valid = y[:, :24], y[:, 24:]
+    fit = holtwinters.fit_holt_winters(train)
+    forecasts = holtwinters.forecast(fit, 12)
+
+    same_optimum = 0
+    for i in range(len(y)):
+        result = statsmodels_fit(train[i])
+        assert fit["sse"][i] <= result.sse * (1 + 1e-6)
+        if fit["sse"][i] < result.sse * (1 - SSE_TOLERANCE):
+            continue
+
+        same_optimum += 1
+        scale = train[i].mean()
+        expected = result.forecast(12)
+        assert np.abs(forecasts[i] - expected).max() <= TOLERANCE * scale
+        assert np.abs(np.abs(forecasts[i] - valid[i]).mean() - np.abs(expected - valid[i]).mean()) <= TOLERANCE * scale
+
+    assert same_optimum >= 0.75 * len(y)
+
+
+# batch_holt_winters_mae splits every route (rows in any order) at 2024 and fits all routes together,
+# giving the mae_holt of route_insight. Routes without two training years or a full 2024 get NaN.
+def test_batch_mae_matches_route_insight():
+    groups = routes()
+    shuffled = [(route, route_df.sample(frac=1, random_state=0)) for route, route_df in groups]
+    short = ("S → X", groups[0][1].iloc[6:])
+    maes = analysis.batch_holt_winters_mae(shuffled + [short])
+
+    assert np.isnan(maes["S → X"])
+
+    agreeing = 0
+    for route, route_df in groups:
+        train = route_df["PASSENGERS"].to_numpy()[:24]
+        expected = analysis.route_insight(route, route_df)["mae_holt"]
+        # Rounded to one decimal in route_insight
+        if abs(maes[route] - expected) <= TOLERANCE * train.mean() + 0.05:
+            agreeing += 1
+        else:
+            assert holtwinters.fit_holt_winters(train[None])["sse"][0] < statsmodels_fit(train).sse
+
+    assert agreeing >= 0.75 * len(groups)
+
+
+# R0 → X is flown by two connections in 2022 and 2023 and by one in 2024. Both Holt-Winters modes of
+# generate_route_insights fit its monthly totals; per-connection rows are not a monthly series.
+def test_route_with_several_connections_is_fitted_on_its_monthly_totals(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "Data").mkdir()
+    rows = []
+    for route, route_df in routes():
+        route_df = route_df.assign(ORIGIN=route.split(" → ")[0], DEST="X")
+        if route == "R0 → X":
+            half = route_df["PASSENGERS"] * 0.5
+            first = route_df.assign(PASSENGERS=half.where(route_df["DATE"] < "2024-01-01", route_df["PASSENGERS"]))
+            second = route_df.assign(PASSENGERS=half)[route_df["DATE"] < "2024-01-01"]
+            route_df = pd.concat([first, second])
+        rows.append(route_df)
+    df = pd.concat(rows, ignore_index=True)
+
+    maes = {mode: analysis.generate_route_insights(df.copy(), holt_winters=mode).set_index("route")["mae_holt"]
+            for mode in ("statsmodels", "batch")}
+    route_df = routes()[0][1]
+    expected = analysis.route_insight("R0 → X", route_df)["mae_holt"]
+
+    assert maes["statsmodels"]["R0 → X"] == expected
+    assert abs(maes["batch"]["R0 → X"] - expected) <= TOLERANCE * route_df["PASSENGERS"].mean() + 0.05
+    assert np.isnan(analysis.batch_holt_winters_mae([("R0 → X", df[df["ORIGIN"] == "R0"])])["R0 → X"])
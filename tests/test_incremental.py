@@ -0,0 +1,52 @@
+import os
+import sys
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import incremental
+import preprocess
+from ingest import CONNECTION_KEYS, load_connections
+from datastore import load_grouped
+from Connection_473 import MIN_PAX_PER_DEPARTURE, passing_connections, read_monthly_connection_stats
+from synthetic import synthetic_connections, synthetic_segments
+
+RAW_FILE = "Data/T_T100I_SEGMENT_ALL_CARRIER_2024.csv"
+
+
+# January to June were grouped by a full preprocess run, July to December come either with the
+# republished yearly file or in a file of their own (then the stats of the first half come from the
+# grouped data). The year is checked with all 12 months and the grouped data matches a full run.
+@pytest.mark.parametrize("new_file", [RAW_FILE, "Data/T_T100I_SEGMENT_ALL_CARRIER_2024_07-12.csv"])
+def test_year_started_by_preprocess_is_completed_incrementally(tmp_path, monkeypatch, new_file):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("Data")
+    os.symlink(os.path.join(ROOT, "airports.dat"), "airports.dat")
+
+    con = synthetic_connections(40)
+    con[CONNECTION_KEYS].to_excel(incremental.CONNECTIONS_FILE, index=False)
+    raw = synthetic_segments(con, 2024, rows=900)
+    raw[raw["MONTH"] <= 6].to_csv(RAW_FILE, index=False)
+    preprocess.preprocess({2024: RAW_FILE})
+
+    new_rows = raw if new_file == RAW_FILE else raw[raw["MONTH"] > 6]
+    new_rows.to_csv(new_file, index=False)
+    incremental.refresh([new_file])
+
+    raw.to_csv("full_year.csv", index=False)
+    connections = pd.MultiIndex.from_frame(con[CONNECTION_KEYS])
+    expected = passing_connections(read_monthly_connection_stats("full_year.csv", connections), MIN_PAX_PER_DEPARTURE)
+    passed = load_connections(incremental.CONNECTIONS_FILE)
+    assert 0 < len(expected) < len(connections)
+    assert set(passed) == set(expected)
+
+    full = preprocess.group_segments("full_year.csv", passed)
+    grouped = load_grouped()
+    flows = ["PASSENGERS", "SEATS", "DEPARTURES_PERFORMED"]
+    pd.testing.assert_frame_equal(
+        grouped.set_index(["con_key", "MONTH"])[flows].sort_index(),
+        full.set_index(["con_key", "MONTH"])[flows].sort_index(),
+        check_index_type=False)
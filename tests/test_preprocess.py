@@ -0,0 +1,33 @@
+import os
+import sys
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import preprocess
+from ingest import CONNECTION_KEYS
+from synthetic import synthetic_connections, synthetic_segments
+
+
+# The grouped data keeps the baseline aggregation: per connection and month passengers, seats and
+# departures take the value of the first raw row, like all other columns of columns_to_keep (the "first"
+# entries replace the sums in the aggregations dict). Summing them is a separate change of the values.
+def test_grouped_flows_keep_the_first_row_per_connection_and_month(tmp_path):
+    con = synthetic_connections(20)
+    # About twice as many rows as connection months: several rows (e.g. service classes) per month
+    raw = synthetic_segments(con, 2022, rows=480)
+    path = tmp_path / "segments.csv"
+    raw.to_csv(path, index=False)
+
+    grouped = preprocess.group_segments(str(path), pd.MultiIndex.from_frame(con[CONNECTION_KEYS]))
+
+    flows = ["PASSENGERS", "SEATS", "DEPARTURES_PERFORMED"]
+    keys = preprocess.make_keys(raw).rename("con_key")
+    expected = raw.groupby([keys, raw["MONTH"]])[flows].first().astype("float64").sort_index()
+    actual = grouped.set_index(["con_key", "MONTH"])[flows].sort_index()
+
+    assert raw.groupby([keys, raw["MONTH"]]).size().max() > 1
+    assert list(grouped.columns[1:4]) == flows
+    pd.testing.assert_frame_equal(actual, expected, check_index_type=False)
@@ -0,0 +1,53 @@
+import os
+import sys
+import importlib
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+pytest.importorskip("dash")
+from forecasting import lookup_route_rows
+from shared_data import SHARED_DATA_DIR, column_file, load_dashboard_data, write_shared_data
+from synthetic import synthetic_grouped, write_dashboard_inputs
+
+
+# Memory map (np.load(mmap_mode="r")) an array is a view of, None if it isn't one
+def memory_map(values):
+    while values is not None and not isinstance(values, np.memmap):
+        values = values.base
+    return values
+
+
+# Column values as stored in the shared files: the codes of categoricals
+def stored_values(column):
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.array.codes
+    return column.to_numpy()
+
+
+# After the dashboard started on the shared files (route index and top routes cube built), every column
+# of its data, and the rows of a route lookup, still point into the memory maps of the column files
+@pytest.mark.parametrize("name", ["dashboard", "dashboard_auto"])
+def test_dashboard_columns_stay_memory_mapped(name, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_dashboard_inputs(synthetic_grouped(30), str(tmp_path))
+    write_shared_data(load_dashboard_data(compact=True))
+    monkeypatch.delitem(sys.modules, name, raising=False)
+    dashboard = importlib.import_module(name)
+
+    assert dashboard.data_source == "shared"
+    origin, dest = dashboard.route_options[0]["value"].split("-")
+    rows = lookup_route_rows(dashboard.route_index, origin, dest)
+    assert len(rows) > 0
+
+    for col in dashboard.data.columns:
+        values = stored_values(dashboard.data[col])
+        mapped = memory_map(values)
+        assert mapped is not None, col
+        assert os.path.samefile(mapped.filename, column_file(SHARED_DATA_DIR, col))
+        assert np.shares_memory(values, mapped)
+        assert np.shares_memory(stored_values(rows[col]), mapped)
@@ -0,0 +1,75 @@
+import os
+import sys
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+pytest.importorskip("pyarrow")
+from analysis import compute_top_routes
+from shared_data import load_dashboard_data
+from synthetic import synthetic_grouped, write_dashboard_inputs
+from top_routes import build_top_routes_cube, top_routes
+
+
+# Compact and plain dashboard data of synthetic connections, a few months without seats
+@pytest.fixture
+def dashboard_data(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_dashboard_inputs(synthetic_grouped(30), str(tmp_path))
+    data = {compact: load_dashboard_data(compact=compact) for compact in (True, False)}
+    for df in data.values():
+        df.loc[df.index[::17], "SEATS"] = 0
+    return data
+
+
+# Top routes as the dashboard filtered them before the cube: masks on the plain data for every selection
+def filtered_top_routes(data, selected_year, selected_month):
+    df_filtered = data.copy()
+
+    if selected_year != "all":
+        df_filtered = df_filtered[df_filtered["YEAR"] == int(selected_year)]
+
+    if selected_month != "all":
+        df_filtered = df_filtered[df_filtered["MONTH"] == int(selected_month)]
+
+    df_filtered = df_filtered[df_filtered["SEATS"] > 0]
+    df_filtered["ROUTE"] = df_filtered["ORIGIN"] + " → " + df_filtered["DEST"]
+
+    top = df_filtered.groupby("ROUTE", as_index=False).agg({"PASSENGERS": "sum", "SEATS": "sum"})
+    top["LOAD_FACTOR"] = top["PASSENGERS"] / top["SEATS"]
+    return top.sort_values("PASSENGERS", ascending=False).head(3)
+
+
+# Dropdown values come as strings (or the year as a number) from the dashboard
+@pytest.mark.parametrize("year, month", [
+    ("all", "all"), ("2023", "all"), ("all", "7"), (2024, "12"), ("2022", "1"),
+])
+def test_cube_matches_filtering_the_data(dashboard_data, year, month):
+    cube = build_top_routes_cube(dashboard_data[True])
+
+    expected = filtered_top_routes(dashboard_data[False], year, month)
+    actual = top_routes(cube, year, month, n=3)
+
+    pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected.reset_index(drop=True),
+                                  check_dtype=False, check_exact=False)
+
+
+def test_cleared_or_unknown_selection_has_no_routes(dashboard_data):
+    cube = build_top_routes_cube(dashboard_data[True])
+
+    for year, month in [(None, "all"), ("all", None), (None, None), ("1990", "all")]:
+        routes = top_routes(cube, year, month)
+        assert routes.empty and list(routes.columns) == ["ROUTE", "PASSENGERS", "SEATS", "LOAD_FACTOR"]
+
+
+# Over all years and months the cube ranks the routes like compute_top_routes (all seats available)
+def test_all_time_ranking_matches_compute_top_routes():
+    df = synthetic_grouped(30)
+    expected = compute_top_routes(df.copy(), top_n=5)
+    actual = top_routes(build_top_routes_cube(df), "all", "all", n=5)
+
+    pd.testing.assert_frame_equal(actual[["ROUTE", "PASSENGERS"]].reset_index(drop=True),
+                                  expected.reset_index(drop=True), check_dtype=False)
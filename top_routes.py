@@ -0,0 +1,41 @@
+import pandas as pd
+
+# Columns of every slice of the top routes cube
+CUBE_COLUMNS = ["ROUTE", "PASSENGERS", "SEATS", "LOAD_FACTOR"]
+
+
+# Aggregate passengers and seats per (YEAR, MONTH, ROUTE) once, including the roll-ups over
+# all years and/or all months. Rows without seats are left out (protection against division by 0).
+# ORIGIN and DEST may be categoricals, only observed routes are aggregated.
+# Returns a dict (year or "all", month or "all") -> DataFrame with one row per route.
+def build_top_routes_cube(df):
+    df = df[df["SEATS"] > 0]
+
+    base = df.groupby(["YEAR", "MONTH", "ORIGIN", "DEST"], as_index=False, observed=True)[["PASSENGERS", "SEATS"]].sum()
+    base["ROUTE"] = base["ORIGIN"].astype(str) + " → " + base["DEST"].astype(str)
+    base["ALL_YEARS"] = "all"
+    base["ALL_MONTHS"] = "all"
+
+    cube = {}
+    for year_key, month_key in [("YEAR", "MONTH"), ("YEAR", "ALL_MONTHS"), ("ALL_YEARS", "MONTH"), ("ALL_YEARS", "ALL_MONTHS")]:
+        rolled = base.groupby([year_key, month_key, "ROUTE"], as_index=False)[["PASSENGERS", "SEATS"]].sum()
+        rolled["LOAD_FACTOR"] = rolled["PASSENGERS"] / rolled["SEATS"]
+
+        for (year, month), part in rolled.groupby([year_key, month_key], sort=False):
+            cube[(year, month)] = part[CUBE_COLUMNS].reset_index(drop=True)
+
+    return cube
+
+
+# Top n routes of a year/month (each can be "all") sorted by the given column.
+# No routes when the year or month is not selected (cleared dropdown).
+def top_routes(cube, year, month, n=3, by="PASSENGERS"):
+    if year is None or month is None:
+        return pd.DataFrame(columns=CUBE_COLUMNS)
+    year = year if year == "all" else int(year)
+    month = month if month == "all" else int(month)
+
+    routes = cube.get((year, month))
+    if routes is None:
+        return pd.DataFrame(columns=CUBE_COLUMNS)
+    return routes.nlargest(n, by)